@@ -2,26 +2,41 @@
 # Copyright (c) 2022 - 2023 chargebyte GmbH
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 
+import contextlib
+import copy
+import io
+import multiprocessing
 from pathlib import Path
+from typing import Dict
 import cbexigen.tools_config as tools_conf
 from cbexigen import SchemaAnalyzer as Analyzer
 from cbexigen.typeDefinitions import AnalyzerData
-from cbexigen import tools_generator, tools, tools_logging
+from cbexigen import tools_generator, tools, tools_logging, tools_cache, tools_profile, tools_schema, tools_watch
 from cbexigen.datatype_classes import DatatypeHeader, DatatypeCode
 from cbexigen.decoder_classes import ExiDecoderHeader, ExiDecoderCode
 from cbexigen.encoder_classes import ExiEncoderHeader, ExiEncoderCode
 
+# the static files of the grammar table interpreter, only generated if a schema uses grammar tables
+GRAMMAR_TABLE_FILES = ['exi_grammar_table.h', 'exi_grammar_table.c']
+
+
 
 class FileGenerator(object):
 
-    def __init__(self):
+    def __init__(self, context: tools_conf.GenerationContext):
+        self.context = context
         self.__analyzer_data = AnalyzerData()
         self.__schema = None
 
         self.__analyzer_data_printed = False
-        self.__analyzer_data.add_debug_code_enabled = tools_conf.CONFIG_PARAMS['add_debug_code']
+        self.__analyzer_data.add_debug_code_enabled = self.context.params['add_debug_code']
         self.__analyzer_data.debug_code_current_message_id = 1
 
+        # contexts of the codec variants of the config, and the snapshots of the analysis of the schema
+        # structure by schema file and prefix, shared by the codec variants of a file group
+        self.__variants = None
+        self.__snapshots = None
+
     def __analyzer_data_clear(self):
         self.__analyzer_data.schema_identifier = ''
         self.__analyzer_data.root_elements.clear()
@@ -38,18 +53,27 @@ class FileGenerator(object):
         self.__analyzer_data.namespace_elements.clear()
         self.__analyzer_data.schema_builtin_types.clear()
 
+        self.__analyzer_data.selected_messages.clear()
+        self.__analyzer_data.pruned_messages.clear()
+        self.__analyzer_data.pruned_elements.clear()
+
+        self.__analyzer_data.schema_enumerations.clear()
+        self.__analyzer_data.schema_element_names.clear()
+        self.__analyzer_data.type_dependencies.clear()
+        self.__analyzer_data.element_grammars.clear()
+
         self.__analyzer_data.debug_code_current_message_id = 1
         self.__analyzer_data.debug_code_messages.clear()
 
     def __init_schema(self, parameters):
-        schema_full_name = Path(tools_conf.CONFIG_ARGS['schema_base_dir'], parameters['schema']).resolve()
+        schema_full_name = Path(self.context.args['schema_base_dir'], parameters['schema']).resolve()
         schema_path = schema_full_name.parent.resolve()
         schema_prefix = parameters['prefix']
 
         if self.__schema is not None:
-            schema_file = self.__schema.get_current_schema_file().name
-            schema_url = self.__schema.get_current_schema().base_url
-            if str(schema_full_name) != schema_file or str(schema_path) != schema_url:
+            schema_file = self.__schema.get_schema()
+            schema_url = self.__schema.get_schema_base()
+            if str(schema_full_name) != str(schema_file) or str(schema_path) != str(schema_url):
                 self.__schema.close()
                 self.__schema = None
                 self.__analyzer_data_clear()
@@ -60,11 +84,36 @@ class FileGenerator(object):
         if self.__schema is None:
             tools_logging.msg_write('*** Generator info: Schema changed. Generating new analyzer data. ***', True)
             self.__schema = Analyzer.SchemaAnalyzer(schema_full_name, schema_path, self.__analyzer_data,
-                                                    schema_prefix)
-            self.__schema.open()
-
-            tools_logging.msg_write('*** Elements: ' + parameters['schema'] + ' ***', True)
-            self.__schema.analyze_schema_elements()
+                                                    schema_prefix, self.context)
+            with tools_profile.profile_phase('cache load', parameters['schema']):
+                loaded = tools_cache.load_analyzer_data(schema_full_name, schema_prefix, self.__analyzer_data)
+            if loaded:
+                tools_logging.msg_write('*** Generator info: Analyzer data loaded from cache. ***', True)
+                return
+
+            snapshot_key = (str(schema_full_name), schema_prefix)
+            if self.__snapshots is not None and snapshot_key in self.__snapshots:
+                schema, snapshot = self.__snapshots[snapshot_key]
+                with tools_profile.profile_phase('snapshot restore', parameters['schema']):
+                    self.__schema.open_built_schema(schema)
+                    tools_cache.restore_analyzer_data_snapshot(snapshot, self.__analyzer_data)
+                tools_logging.msg_write('*** Generator info: Schema analysis taken from snapshot. ***', True)
+            else:
+                with tools_profile.profile_phase('schema build', parameters['schema']):
+                    self.__schema.open()
+
+                tools_logging.msg_write('*** Elements: ' + parameters['schema'] + ' ***', True)
+                self.__schema.analyze_schema_structure()
+                if self.__snapshots is not None:
+                    with tools_profile.profile_phase('snapshot take', parameters['schema']):
+                        snapshot = tools_cache.get_analyzer_data_snapshot(self.__analyzer_data)
+                    self.__snapshots[snapshot_key] = (self.__schema.get_current_schema(), snapshot)
+
+            self.__schema.apply_config_selections()
+            self.__analyzer_data.freeze()
+            with tools_profile.profile_phase('cache save', parameters['schema']):
+                tools_cache.save_analyzer_data(schema_full_name, schema_prefix, self.__analyzer_data,
+                                               self.__schema.get_schema_files())
 
     def __generate_debug_files(self, parameters):
         if not self.__analyzer_data.add_debug_code_enabled or parameters['type'] == 'converter':
@@ -113,7 +162,10 @@ class FileGenerator(object):
             generator = tools_generator.get_generator()
             temp = generator.get_template(config['template'])
             code = temp.render(filename=config['filename'], filekey=config['identifier'],
-                               add_debug_code=self.__analyzer_data.add_debug_code_enabled)
+                               add_debug_code=self.__analyzer_data.add_debug_code_enabled,
+                               bitstream_word_access=self.context.params['bitstream_word_access'],
+                               string_max_length=self.context.params['string_max_length'],
+                               byte_array_max_length=self.context.params['byte_array_max_length'])
 
             tools.save_code_to_file(config['filename'], code, parameters['folder'])
         except KeyError as err:
@@ -131,43 +183,40 @@ class FileGenerator(object):
             generator = tools_generator.get_generator()
             temp = generator.get_template(config['template'])
             code = temp.render(filename=config['filename'], filekey=config['identifier'],
-                               add_debug_code=self.__analyzer_data.add_debug_code_enabled)
+                               add_debug_code=self.__analyzer_data.add_debug_code_enabled,
+                               bitstream_word_access=self.context.params['bitstream_word_access'],
+                               string_max_length=self.context.params['string_max_length'],
+                               byte_array_max_length=self.context.params['byte_array_max_length'])
 
             tools.save_code_to_file(config['filename'], code, parameters['folder'])
         except KeyError as err:
             tools_logging.log_write_error(f'Exception in {self.__class__.__name__}.{self.__generate_static_c.__name__} '
                                           f'(KeyError): {err}')
 
-    @staticmethod
-    def __generate_converter_h(current_schema, parameters, info_data: AnalyzerData):
-        header = DatatypeHeader(current_schema, parameters, info_data, True)
+    def __generate_converter_h(self, parameters, info_data: AnalyzerData):
+        header = DatatypeHeader(parameters, info_data, True, self.context)
         header.generate_file()
 
-    @staticmethod
-    def __generate_converter_c(current_schema, parameters, info_data: AnalyzerData):
-        code = DatatypeCode(current_schema, parameters, info_data, True)
+    def __generate_converter_c(self, parameters, info_data: AnalyzerData):
+        code = DatatypeCode(parameters, info_data, True, self.context)
         code.generate_file()
         code.disable_logging()
 
-    @staticmethod
-    def __generate_decoder_h(parameters, info_data: AnalyzerData):
-        header = ExiDecoderHeader(parameters, True)
+    def __generate_decoder_h(self, parameters, info_data: AnalyzerData):
+        header = ExiDecoderHeader(parameters, True, self.context)
         header.generate_file()
 
-    @staticmethod
-    def __generate_decoder_c(parameters, info_data: AnalyzerData):
-        code = ExiDecoderCode(parameters, info_data, True)
+    def __generate_decoder_c(self, parameters, info_data: AnalyzerData):
+        code = ExiDecoderCode(parameters, info_data, True, self.context)
         code.generate_file()
         code.disable_logging()
 
-    @staticmethod
-    def __generate_encoder_h(parameters, info_data: AnalyzerData):
-        header = ExiEncoderHeader(parameters, True)
+    def __generate_encoder_h(self, parameters, info_data: AnalyzerData):
+        header = ExiEncoderHeader(parameters, True, self.context)
         header.generate_file()
 
-    @staticmethod
-    def __generate_encoder_c(parameters, info_data: AnalyzerData):
-        code = ExiEncoderCode(parameters, info_data, True)
+    def __generate_encoder_c(self, parameters, info_data: AnalyzerData):
+        code = ExiEncoderCode(parameters, info_data, True, self.context)
         code.generate_file()
         code.disable_logging()
 
@@ -183,13 +232,12 @@ class FileGenerator(object):
             self.__init_schema(parameters)
 
             # call file generation
-            current_schema = self.__schema.get_current_schema()
             tools_logging.msg_write('*** Generator info: ' + parameters['schema'] + ' ***', True)
 
             if is_header:
-                self.__generate_converter_h(current_schema, parameters, self.__analyzer_data)
+                self.__generate_converter_h(parameters, self.__analyzer_data)
             else:
-                self.__generate_converter_c(current_schema, parameters, self.__analyzer_data)
+                self.__generate_converter_c(parameters, self.__analyzer_data)
 
             if not self.__analyzer_data_printed:
                 self.__schema.write_analyzer_data_to_log()
@@ -225,19 +273,137 @@ class FileGenerator(object):
         else:
             tools_logging.msg_write('exec_function: type unknown ' + func_type)
 
-    def generate_files(self):
-        config_module = tools_conf.get_config_module()
-        files = config_module.c_files_to_generate
+    def generate_files(self, changed_schema_files=None):
+        """
+            Generates the files of the config. With changed schema files, only the file groups of the
+            schemas using one of the changed files are generated.
+        """
+        with tools_conf.activate_context(self.context):
+            groups = self.__get_file_groups(self.context.get_config_module().c_files_to_generate)
+            if changed_schema_files is not None:
+                groups = [group for group in groups if self.__uses_schema_files(group, changed_schema_files)]
+
+            self.__get_variants(True)
+            if self.context.args['jobs'] > 1:
+                self.__generate_files_parallel(groups)
+            else:
+                # the snapshots of the analysis are kept for the file group of a schema only
+                for group in groups:
+                    self.generate_file_group(group)
+
+            tools.write_manifest()
+
+    def __uses_schema_files(self, group, schema_files):
+        for params in group:
+            if 'schema' in params:
+                schema_file = Path(self.context.args['schema_base_dir'], params['schema'])
+                return len(tools_schema.get_schema_files(schema_file) & schema_files) > 0
 
+        return False
+
+    def __get_variants(self, report_errors=False):
+        if self.__variants is not None:
+            return self.__variants
+
+        self.__variants = []
+        for index, overlay in enumerate(getattr(self.context.get_config_module(), 'codec_variants', [])):
+            name = overlay.get('name', overlay.get('output_dir', str(index + 1)))
+            if 'output_dir' not in overlay:
+                if report_errors:
+                    tools_logging.log_write_error(f'Codec variant {name} has no output_dir and is not generated.')
+                continue
+
+            fixed = self.context.get_variant_fixed_values(overlay)
+            if len(fixed) > 0:
+                if report_errors:
+                    tools_logging.log_write_error(f'Codec variant {name} is not generated, it changes '
+                                                  f'{", ".join(fixed)} which is the same for all variants.')
+                continue
+
+            self.__variants.append(self.context.create_variant(overlay))
+
+        return self.__variants
+
+    def __add_variant_files(self, variant: tools_conf.GenerationContext):
+        # the files of a codec variant are listed with the name of the variant in front
+        for name, status in variant.generated_files.items():
+            self.context.generated_files[f'{variant.variant_name}/{name}'] = status
+
+        if self.context.output is not None:
+            for name, code in variant.output.items():
+                self.context.output[f'{variant.variant_name}/{name}'] = code
+
+    @staticmethod
+    def __get_file_groups(files):
+        # consecutive entries with the same schema share the analyzer data, so they are generated
+        # together in the same order as the serial generation. static entries have no schema and
+        # do not change the analyzer data, they are added to the current group.
+        groups = []
+        last_schema = None
+        for params in files.values():
+            schema = params.get('schema', None)
+            if len(groups) == 0 or (schema is not None and last_schema is not None and schema != last_schema):
+                groups.append([])
+            groups[-1].append(params)
+            if schema is not None:
+                last_schema = schema
+
+        return groups
+
+    def __generate_files_parallel(self, groups):
+        if len(groups) == 0:
+            return
+
+        jobs = min(self.context.args['jobs'], len(groups))
+        in_memory = self.context.output is not None
+        tasks = [(dict(self.context.args), in_memory, group) for group in groups]
+
+        # every group gets a new worker process, so the results do not depend on the groups before
+        with multiprocessing.Pool(processes=jobs, maxtasksperchild=1) as pool:
+            results = pool.starmap(generate_file_group_in_worker, tasks)
+
+        # the console output and the logs are written in the order of the serial generation
+        for output, log_text, error_text, generated_files, files_output, profile_data in results:
+            print(output, end='')
+            tools_logging.log_write_buffered(log_text, error_text)
+            self.context.generated_files.update(generated_files)
+            if in_memory:
+                self.context.output.update(files_output)
+            tools_profile.profile_add_data(*profile_data)
+
+    def generate_file_group(self, group):
+        with tools_conf.activate_context(self.context):
+            variants = self.__get_variants()
+            # the codec variants generate the group from the entries of the config, before they are changed
+            variant_groups = [copy.deepcopy(group) for _ in variants]
+            self.__snapshots = {} if len(variants) > 0 else None
+            self.__generate_file_group(group)
+
+            for variant, variant_group in zip(variants, variant_groups):
+                tools_logging.msg_write(f'*** Codec variant: {variant.variant_name} ***', True)
+                generator = FileGenerator(variant)
+                generator.__snapshots = self.__snapshots
+                with tools_conf.activate_context(variant):
+                    generator.__generate_file_group(variant_group)
+                self.__add_variant_files(variant)
+
+            self.__snapshots = None
+
+    def __generate_file_group(self, group):
         self.__schema = None
         self.__analyzer_data_clear()
+        self.__analyzer_data_printed = False
+
+        for params in group:
+            if params['type'] == 'static' and not self.__is_static_file_used(params):
+                continue
 
-        for name, params in files.items():
             h_config = params.get('h', None)
             if h_config is not None:
                 # h-file has to be generated
                 tools_logging.msg_write('GENERATING: ' + h_config['filename'], True)
-                self.__generate(True, params)
+                with tools_profile.profile_phase('file', h_config['filename']):
+                    self.__generate(True, params)
 
             c_config = params.get('c', None)
             if c_config is not None:
@@ -247,6 +413,131 @@ class FileGenerator(object):
                         params['c']['include_other'].append(log_name)
                 # c-file has to be generated
                 tools_logging.msg_write('GENERATING: ' + c_config['filename'], True)
-                self.__generate(False, params)
+                with tools_profile.profile_phase('file', c_config['filename']):
+                    self.__generate(False, params)
 
                 self.__generate_debug_files(params)
+
+    @staticmethod
+    def __is_static_file_used(params):
+        filenames = [params[kind]['filename'] for kind in ['h', 'c'] if kind in params]
+        if any(name in GRAMMAR_TABLE_FILES for name in filenames) and not tools_conf.is_grammar_tables_enabled():
+            tools_logging.log_write(f'{", ".join(filenames)} not generated, no schema uses grammar tables.')
+            return False
+
+        return True
+
+
+def generate_file_group_in_worker(config_args, in_memory, group):
+    """
+        Generates a group of entries of c_files_to_generate in a worker process of the parallel generation.
+        Returns the console output, the log, the error log, the generated files, their content if the
+        generation is in memory and the profile data of the group.
+    """
+    context = tools_conf.GenerationContext(output={} if in_memory else None)
+    context.args.update(config_args)
+    with tools_conf.activate_context(context):
+        tools_conf.process_config_parameters()
+        log_buffer, error_buffer = tools_logging.log_init_buffered()
+        if tools_profile.profile_enabled():
+            tools_profile.profile_start()
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        generator = FileGenerator(context)
+        generator.generate_file_group(group)
+
+    return (output.getvalue(), log_buffer.getvalue(), error_buffer.getvalue(), context.generated_files,
+            context.output, tools_profile.profile_get_data())
+
+
+def generate_codec(config_file, program_dir=None, jobs=1, verbosity=0) -> Dict[str, str]:
+    """
+        Generates the codec of the config file in memory and returns the content of the generated files
+        by their path relative to the output directory of the config. Nothing is written to the output
+        and the log directory, the cache directory of the config is used. Every call has its own
+        generation context, so several configs can be generated at the same time in parallel threads.
+        The paths of the config are relative to program_dir, by default the directory of main.py.
+    """
+    if program_dir is None:
+        program_dir = Path(__file__).parent.parent.resolve()
+
+    context = tools_conf.GenerationContext(config_file, program_dir, output={})
+    context.args['jobs'] = max(1, jobs)
+    context.args['verbosity'] = verbosity
+    with tools_conf.activate_context(context):
+        if not tools_conf.check_config_file():
+            raise FileNotFoundError(f'Config file {config_file} does not exist.')
+        tools_conf.init_config_args()
+        context.args['log_dir'] = ''
+
+    generator = FileGenerator(context)
+    generator.generate_files()
+
+    return context.output
+
+
+def __create_watch_context(context: tools_conf.GenerationContext):
+    # the config is loaded again, the arguments of the command line are kept
+    new_context = tools_conf.GenerationContext(context.args['config_file'], context.args['program_dir'])
+    for name in ['jobs', 'verbosity', 'profile', 'watch']:
+        new_context.args[name] = context.args[name]
+
+    with tools_conf.activate_context(new_context):
+        if not tools_conf.check_config_file():
+            raise FileNotFoundError(f'Config file {context.args["config_file"]} does not exist.')
+        tools_conf.init_config_args()
+        if not tools_conf.check_config_parameters():
+            raise ValueError('Error in config file.')
+
+    return new_context
+
+
+def __get_watch_paths(context: tools_conf.GenerationContext):
+    return [Path(context.args['program_dir'], context.args['config_file']).resolve(),
+            context.args['schema_base_dir'], context.args['template_dir']]
+
+
+def watch_files(context: tools_conf.GenerationContext):
+    """
+        Watches the config file, the schemas and the templates and generates the files again on every
+        change, until the generator is interrupted. A changed template generates all files again with the
+        analyzer data kept in memory, a changed schema generates only the files of the schemas using it
+        and a changed config generates all files with the new config. The changed output files are listed.
+    """
+    paths = __get_watch_paths(context)
+    states = tools_watch.get_file_states(paths)
+    print(f'Watching {", ".join(str(path) for path in paths)} for changes. Press Ctrl+C to stop.')
+
+    try:
+        while True:
+            states, changed = tools_watch.wait_for_changes(paths, states)
+
+            try:
+                changed_schema_files = None
+                if paths[0] in changed:
+                    context = __create_watch_context(context)
+                    paths = __get_watch_paths(context)
+                    states = tools_watch.get_file_states(paths)
+                elif any(Path(context.args['template_dir']) in file.parents for file in changed):
+                    tools_generator.reload_templates()
+                else:
+                    changed_schema_files = changed
+
+                # the files which are not generated again keep their content
+                for name in context.generated_files.keys():
+                    context.generated_files[name] = 'unchanged'
+                generator = FileGenerator(context)
+                generator.generate_files(changed_schema_files)
+            except Exception as err:
+                tools_logging.log_write_error(f'Generation after changes of {", ".join(map(str, changed))} '
+                                              f'failed: {err}')
+                print(f'Generation failed: {err}')
+                continue
+
+            changed_files = sorted(name for name, status in context.generated_files.items() if status != 'unchanged')
+            print(f'{len(changed_files)} generated files changed.')
+            for name in changed_files:
+                print(f'{context.generated_files[name]:<10} {name}')
+    except KeyboardInterrupt:
+        print('Watching stopped.')
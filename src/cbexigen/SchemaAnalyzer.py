@@ -2,22 +2,27 @@
 # Copyright (c) 2022 - 2023 chargebyte GmbH
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 from typing import Union
+from pathlib import Path
+from urllib.parse import urlparse, unquote
 
 from xmlschema import XMLSchema11, XsdElement, XsdType, XsdAttribute
 from xmlschema.validators import (XsdSimpleType, XsdComplexType, XsdGroup, XsdAnyElement, Xsd11AnyElement,
                                   Xsd11AtomicRestriction, Xsd11Element)
 
 from cbexigen import tools
-from cbexigen.typeDefinitions import AnalyzerData, OCCURRENCE_LIMITS_CORRECTED, FragmentData
+from cbexigen.typeDefinitions import AnalyzerData, OCCURRENCE_LIMITS_CORRECTED, FragmentData, CODER_DIRECTIONS
 from cbexigen.elementData import Particle, Choice, ElementData
 from cbexigen.tools_logging import log_write, log_write_dict, log_write_element, msg_write, \
-    log_write_element_pos_data
-from cbexigen.tools_config import CONFIG_PARAMS, get_config_module
+    log_write_element_pos_data, log_write_error, msg_trace, msg_trace_enabled
+from cbexigen.tools_config import GenerationContext, get_context, get_fragment_parameter_for_schema, \
+    get_messages_parameter_for_schema, get_max_lengths_parameter_for_schema
+from cbexigen.tools_profile import profiled
 
 
 class SchemaAnalyzer(object):
 
-    def __init__(self, schema, schema_base, analyzer_data: AnalyzerData, schema_prefix):
+    def __init__(self, schema, schema_base, analyzer_data: AnalyzerData, schema_prefix,
+                 context: GenerationContext = None):
         self.__schema = schema
         self.__schema_base = schema_base
         self.__schema_file = None
@@ -37,11 +42,31 @@ class SchemaAnalyzer(object):
         self.__namespace_elements = analyzer_data.namespace_elements
         self.__schema_builtin_types = analyzer_data.schema_builtin_types
 
-        self.config = CONFIG_PARAMS
+        self.__selected_messages = analyzer_data.selected_messages
+        self.__pruned_messages = analyzer_data.pruned_messages
+        self.__pruned_elements = analyzer_data.pruned_elements
+
+        self.__schema_enumerations = analyzer_data.schema_enumerations
+        self.__schema_element_names = analyzer_data.schema_element_names
+        self.__type_dependencies = analyzer_data.type_dependencies
+
+        self.context = context if context is not None else get_context()
+        self.config = self.context.params
         self.__schema_prefix = schema_prefix
 
         self.__is_iso20 = True if str(self.__schema_prefix).startswith('iso20_') else False
 
+        # lowest level of every type whose child tree was analyzed completely, and the substitutes
+        # added by the particle list of every element, by type and name
+        self.__analyzed_subtrees = {}
+        self.__element_substitutes = {}
+
+        # index of the elements to generate by the names of their particles, as positions in the list
+        # of elements to generate, and the particle names of every element position
+        self.__particle_parents = {}
+        self.__element_positions = {}
+        self.__element_particle_names = []
+
     def open(self):
         if self.__schema is None or self.__schema_base is None:
             return
@@ -53,6 +78,10 @@ class SchemaAnalyzer(object):
 
         self.__current_schema.build()
 
+    def open_built_schema(self, schema: XMLSchema11):
+        # the schema was already built and analyzed for another codec variant
+        self.__current_schema = schema
+
     def close(self):
         if self.__schema_file is not None:
             self.__schema_file.close()
@@ -63,6 +92,24 @@ class SchemaAnalyzer(object):
     def get_current_schema_file(self):
         return self.__schema_file
 
+    def get_schema(self):
+        return self.__schema
+
+    def get_schema_base(self):
+        return self.__schema_base
+
+    def get_schema_files(self):
+        # the schema and all schemas included or imported by it, including the ones of xmlschema itself
+        files = [Path(self.__schema).resolve()]
+        for schema in self.__current_schema.maps.iter_schemas():
+            if schema.url is None:
+                continue
+            url = urlparse(schema.url)
+            if url.scheme == 'file':
+                files.append(Path(unquote(url.path)).resolve())
+
+        return files
+
     # ---------------------------------------------------------------------------
     # general helper functions
     # ---------------------------------------------------------------------------
@@ -374,6 +421,7 @@ class SchemaAnalyzer(object):
 
             if attribute.type.max_length is not None:
                 particle.max_length = attribute.type.max_length
+                particle.schema_max_length = attribute.type.max_length
 
             if attribute.type.min_value is not None:
                 particle.min_value = attribute.type.min_value
@@ -452,6 +500,7 @@ class SchemaAnalyzer(object):
 
             if element.type.max_length:
                 particle.max_length = element.type.max_length
+                particle.schema_max_length = element.type.max_length
 
             if element.type.min_value:
                 particle.min_value = element.type.min_value
@@ -511,6 +560,7 @@ class SchemaAnalyzer(object):
 
             if substitute.type.max_length:
                 particle.max_length = substitute.type.max_length
+                particle.schema_max_length = substitute.type.max_length
 
             if substitute.type.min_value:
                 particle.min_value = substitute.type.min_value
@@ -834,6 +884,9 @@ class SchemaAnalyzer(object):
                                             is_simple_content=True,
                                             min_occurs=1,
                                             max_occurs=1)
+                            if element.type.content.is_restriction() and element.type.content.max_length:
+                                part.max_length = element.type.content.max_length
+                                part.schema_max_length = element.type.content.max_length
                             element_data.particles.append(part)
 
             particles = self.__get_particle_list(element, subst_list)
@@ -845,12 +898,39 @@ class SchemaAnalyzer(object):
 
         return element_data
 
+    def __get_child_element_data(self, child: XsdElement, level, count, substitute_list):
+        """
+            Returns the element data of the child, or None if the type of the child is known already.
+            The element data of a known type is not used, but the substitutes of the child are added
+            to the substitute list in both cases.
+        """
+        key = (child.type, child.name)
+        if child.type.qualified_name in self.__known_elements and key in self.__element_substitutes:
+            substitute_list.extend(self.__element_substitutes[key])
+            return None
+
+        start = len(substitute_list)
+        element_data = self.__get_element_data(child, level, count, substitute_list)
+        self.__element_substitutes[key] = substitute_list[start:]
+
+        return element_data
+
     def __get_child_tree(self, element: XsdElement, level, recursive=True):
         level += 1
         # todo: make recursion depth as global parameter
         if level > 10:
             return
 
+        # the child tree of a type analyzed at the same or a lower level before has no new elements
+        if self.__analyzed_subtrees.get(element.type, level + 1) <= level:
+            return
+
+        self.__get_child_tree_content(element, level, recursive)
+
+        if recursive:
+            self.__analyzed_subtrees[element.type] = min(level, self.__analyzed_subtrees.get(element.type, level))
+
+    def __get_child_tree_content(self, element: XsdElement, level, recursive):
         substitute_list = []
         count = 0
         for child in element.iterchildren():
@@ -859,65 +939,66 @@ class SchemaAnalyzer(object):
 
             count += 1
             type_name = self.__get_type_name(child)
-            msg_write(level * "    " + str(level) + "." + str(count) + " " + child.name + " -> " + type_name)
+            msg_trace('%s%d.%d %s -> %s', level * '    ', level, count, child.name, type_name)
 
             if child.ref:
-                msg_write((level + 1) * "    " + "ref to: " + child.ref.local_name + " -> " + child.ref.type.local_name)
+                msg_trace('%sref to: %s -> %s', (level + 1) * '    ', child.ref.local_name, child.ref.type.local_name)
 
             if self.__is_abstract(child):
-                msg_write((level + 1) * "    " + "ABSTRACT")
+                msg_trace('%sABSTRACT', (level + 1) * '    ')
 
-                element_data = self.__get_element_data(child, level, count, substitute_list)
+                element_data = self.__get_child_element_data(child, level, count, substitute_list)
                 if self.__add_to_known_elements(child):
                     self.__generate_elements.append(element_data)
 
                 if child.type.is_extension():
-                    msg_write((level + 1) * "    " + "ABSTRACT TYPE is extension")
+                    msg_trace('%sABSTRACT TYPE is extension', (level + 1) * '    ')
 
                 qname = self.__get_name(child)
                 sg = self.__current_schema.substitution_groups._target_dict.get(qname)
                 if sg:
                     for substitute in self.__sorted_xsd_elements(sg):
                         substitute_type_name = self.__get_type_name(substitute)
-                        msg_write(level * "    " + str(level) + "." + str(count) + " " +
-                                  substitute.name + " -> " + substitute_type_name)
+                        msg_trace('%s%d.%d %s -> %s', level * '    ', level, count, substitute.name, substitute_type_name)
                         if substitute.type.is_complex():
                             if self.__add_to_known_elements(substitute):
                                 sl = []
                                 substitute_data = self.__get_element_data(substitute, level, count, sl)
                                 self.__generate_elements.append(substitute_data)
 
-                            msg_write(self.__build_particle_comment(substitute, level + 1))
+                            if msg_trace_enabled():
+                                msg_write(self.__build_particle_comment(substitute, level + 1))
                             self.__get_child_tree(substitute, level)
                 else:
-                    msg_write((level + 1) * "    " + "No Substitute group found for " + qname)
+                    msg_trace('%sNo Substitute group found for %s', (level + 1) * '    ', qname)
 
             else:
-                element_data = self.__get_element_data(child, level, count, substitute_list)
+                element_data = self.__get_child_element_data(child, level, count, substitute_list)
                 if substitute_list:
-                    msg_write((level + 1) * "    " + "Substitute list has elements ...")
+                    msg_trace('%sSubstitute list has elements ...', (level + 1) * '    ')
                     for substitute in substitute_list:
                         substitute_type_name = self.__get_type_name(substitute)
-                        msg_write(level * "    " + str(level) + "." + str(count) + " " +
-                                  substitute.name + " -> " + substitute_type_name)
+                        msg_trace('%s%d.%d %s -> %s', level * '    ', level, count, substitute.name, substitute_type_name)
                         if substitute.type.is_complex():
                             if self.__add_to_known_elements(substitute):
                                 sl = []
                                 substitute_data = self.__get_element_data(substitute, level, count, sl)
                                 self.__generate_elements.append(substitute_data)
 
-                            msg_write(self.__build_particle_comment(substitute, level + 1))
+                            if msg_trace_enabled():
+                                msg_write(self.__build_particle_comment(substitute, level + 1))
                             self.__get_child_tree(substitute, level)
 
                 if child.type.is_extension():
-                    msg_write((level + 1) * "    " + "TYPE is extension")
+                    msg_trace('%sTYPE is extension', (level + 1) * '    ')
 
-                if child.type.is_complex() or element_data.type_definition == "enum":
+                if child.type.is_complex() or (element_data is not None and element_data.type_definition == "enum"):
                     if self.__add_to_known_elements(child):
                         self.__generate_elements.append(element_data)
 
                     if child.type.is_complex():
-                        msg_write(self.__build_particle_comment(child, level + 1))
+                        if msg_trace_enabled():
+                            msg_write(self.__build_particle_comment(child, level + 1))
                         if recursive:
                             child_count = self.__get_child_count(child)
                             if child_count > 0:
@@ -926,19 +1007,24 @@ class SchemaAnalyzer(object):
                 if hasattr(child.type, "content"):
                     if hasattr(child.type.content, "model"):
                         if child.type.content.model == 'choice':
-                            msg_write(level * "    " + "TYPE CONTENT of " + child.local_name + " is choice")
+                            msg_trace('%sTYPE CONTENT of %s is choice', level * '    ', child.local_name)
 
                             for content_model in child.type.content.iter_components():
                                 if content_model.name is not None:
-                                    msg_write((level + 1) * "    " + "name: " + content_model.name)
+                                    msg_trace('%sname: %s', (level + 1) * '    ', content_model.name)
                                 else:
                                     if hasattr(content_model, "model"):
-                                        msg_write((level + 1) * "    " + "model: " + content_model.model)
+                                        msg_trace('%smodel: %s', (level + 1) * '    ', content_model.model)
 
     # ---------------------------------------------------------------------------
     # general analyzer functions
     # ---------------------------------------------------------------------------
-    def analyze_schema_elements(self):
+    @profiled('analysis')
+    def analyze_schema_structure(self):
+        """
+            Analyzes the elements of the schema. The result does not depend on the selections of the config
+            which are applied by apply_config_selections(), so it is shared by the codec variants.
+        """
         level = 0
         count = 0
 
@@ -1008,6 +1094,9 @@ class SchemaAnalyzer(object):
         # Build list of elements for namespaces
         self.__build_namespace_element_lists()
 
+        # Build the index of the elements by their particle names for the following scans
+        self.__build_particle_index()
+
         # Scan the abstract elements for occurrence in namespace elements and replace particle list
         self.__scan_abstract_types_for_namespace_elements()
 
@@ -1026,13 +1115,32 @@ class SchemaAnalyzer(object):
         # Adjust min_occurs for elements in choices
         self.__adjust_choice_elements()
 
+    @profiled('analysis')
+    def apply_config_selections(self):
+        """
+            Applies the array optimizations, the message subset and the field lengths of the config
+            to the analyzed elements and prepares the type generation.
+        """
         # Check memory option and make optimization
         if self.config['apply_optimizations'] == 1:
             self.__apply_array_optimizations()
 
+        # Remove the elements which are not reachable from the message subset of the config
+        self.__apply_message_selection()
+
+        # Apply the field lengths of the config and report the memory saved per message
+        self.__apply_max_lengths()
+        self.__log_max_length_savings()
+
         # Do the preparations for type generation
         self.__prepare_for_type_generation()
 
+        # Keep the values of the schema needed for generating the datatypes
+        self.__build_schema_value_lists()
+
+        # Build the dependency graph of the types for the order of generation
+        self.__build_type_dependencies()
+
     def __build_schema_builtin_types_list(self):
         xs_namespace = self.__current_schema.namespaces['xs']
         for value in self.__current_schema.types._target_dict.values():
@@ -1043,6 +1151,7 @@ class SchemaAnalyzer(object):
                     else:
                         self.__schema_builtin_types[value.local_name] = value.simple_type.local_name
 
+    @profiled('analysis')
     def __build_schema_fragment_list(self):
         """
             This function creates the list needed to generate the fragment struct and fragment coding functions.
@@ -1080,7 +1189,7 @@ class SchemaAnalyzer(object):
             for sub_child in child_element.iterchildren():
                 __print_child_recursive(element_list, sub_child)
 
-        config_module = get_config_module()
+        config_module = self.context.get_config_module()
         ambiguous_names_attr = self.__schema_prefix + 'ambiguous_element_names'
         ambiguous_names_list = getattr(config_module, ambiguous_names_attr) \
             if hasattr(config_module, ambiguous_names_attr) else {}
@@ -1124,6 +1233,7 @@ class SchemaAnalyzer(object):
         sorted_by_name = dict(sorted(fragments.items(), key=lambda item: (item[1].name, item[1].namespace)))
         self.__known_fragments.update(sorted_by_name)
 
+    @profiled('analysis')
     def __build_namespace_element_lists(self):
         """
             This function builds the lists needed to generate the root struct and root decoding function.
@@ -1173,6 +1283,7 @@ class SchemaAnalyzer(object):
                     self.__namespace_elements[name] = items
                     break
 
+    @profiled('analysis')
     def __build_generate_elements_types_list(self):
         xs_namespace = self.__current_schema.namespaces['xs']
         type_list = []
@@ -1189,6 +1300,34 @@ class SchemaAnalyzer(object):
 
         log_write('')
 
+    @profiled('analysis')
+    def __build_particle_index(self):
+        self.__particle_parents.clear()
+        self.__element_positions.clear()
+        self.__element_particle_names.clear()
+        for position, element in enumerate(self.__generate_elements):
+            self.__element_positions[id(element)] = position
+            self.__element_particle_names.append(set())
+            self.__update_particle_index(element)
+
+    def __update_particle_index(self, element: ElementData):
+        # has to be called whenever the particle list of an element changes
+        position = self.__element_positions[id(element)]
+        names = set(particle.name for particle in element.particles)
+        for name in self.__element_particle_names[position] - names:
+            self.__particle_parents[name].discard(position)
+        for name in names - self.__element_particle_names[position]:
+            self.__particle_parents.setdefault(name, set()).add(position)
+        self.__element_particle_names[position] = names
+
+    def __get_particle_parents(self, name):
+        # the elements having a particle with the name, in the order of the elements to generate
+        return [self.__generate_elements[position] for position in sorted(self.__particle_parents.get(name, ()))]
+
+    def __has_particle_name(self, element: ElementData, name):
+        return name in self.__element_particle_names[self.__element_positions[id(element)]]
+
+    @profiled('analysis')
     def __scan_abstract_types_for_namespace_elements(self):
         """
             This function scans the list of elements to generate for abstract types.
@@ -1205,7 +1344,7 @@ class SchemaAnalyzer(object):
             if not abstract_element.abstract_type:
                 continue
 
-            for element in self.__generate_elements:
+            for element in self.__get_particle_parents(abstract_element.name_short):
                 for particle in element.particles:
                     if abstract_element.name_short == particle.name and particle.abstract_type:
                         if particle.name in self.__namespace_elements.keys():
@@ -1218,13 +1357,15 @@ class SchemaAnalyzer(object):
                                 particles.append(part)
                             element.particles = particles
                             element.is_in_namespace_elements = True
+                            self.__update_particle_index(element)
                             break
 
+    @profiled('analysis')
     def __scan_particles_for_empty_parent_type(self):
-        empty_list = []
+        empty_list = set()
         for element in self.__generate_elements:
             if element.content_type == 'empty' or (len(element.particles) == 0 and element.type_definition != 'enum'):
-                empty_list.append(element.name_short)
+                empty_list.add(element.name_short)
 
         for element in self.__generate_elements:
             if len(empty_list) > 0:
@@ -1233,20 +1374,18 @@ class SchemaAnalyzer(object):
                         particle.parent_type_is_empty = True
 
     def __get_parent_elements_from_empty_content_element(self, empty_content_element_name):
-        parents = []
-
-        for element in self.__generate_elements:
-            for particle in element.particles:
-                if particle.name == empty_content_element_name:
-                    parents.append(element)
-                    break
-
-        return parents
+        return self.__get_particle_parents(empty_content_element_name)
 
     def __get_parent_elements_with_search_list_particles(self, search_list, element_name):
         parents = []
 
-        for element in self.__generate_elements:
+        # only the elements having at least one of the particles can match
+        positions = set()
+        for name in search_list:
+            positions.update(self.__particle_parents.get(name, ()))
+
+        for position in sorted(positions):
+            element = self.__generate_elements[position]
             if element.name_short == element_name:
                 continue
 
@@ -1260,8 +1399,7 @@ class SchemaAnalyzer(object):
 
         return parents
 
-    @staticmethod
-    def __replace_particle_list_in_parent(parent_element: ElementData, particle_list: list,
+    def __replace_particle_list_in_parent(self, parent_element: ElementData, particle_list: list,
                                           replacement_list: list,
                                           min_occurs: int, max_occurs: int):
         """
@@ -1303,6 +1441,7 @@ class SchemaAnalyzer(object):
         # FIXME abstract_seq may need to inherit min/max_occurs(_old)
         parent_element.abstract_sequences.append((abstract_seq, min_occurs, max_occurs))
         log_write(f'  Adding abstract sequence to {parent_element.name_short}: {abstract_seq}.')
+        self.__update_particle_index(parent_element)
 
     def __copy_particles_from_empty_content_elements(self, element: ElementData, parents):
         parent: ElementData
@@ -1314,8 +1453,7 @@ class SchemaAnalyzer(object):
             p_min_occurs: int = None
             p_max_occurs: int = None
             for particle in element.particles:
-                exist = [x for x in parent.particles if x.name == particle.name]
-                if len(exist) == 0:
+                if not self.__has_particle_name(parent, particle.name):
                     log_write(f'    Add to list and set substitute to false {particle.name}.')
                     # FIXME abstract_seq may need to inherit min/max_occurs(_old)
                     p_min_occurs = particle.min_occurs
@@ -1385,6 +1523,7 @@ class SchemaAnalyzer(object):
             self.__replace_particle_list_in_parent(parent, particles_to_remove, replacement_list,
                                                    p_min_occurs, p_max_occurs)
 
+    @profiled('analysis')
     def __scan_elements_for_empty_content(self):
         """
             This function scans the list of elements to generate for content_type=empty.
@@ -1420,6 +1559,7 @@ class SchemaAnalyzer(object):
 
                     log_write(f'  Deleting {len(element.particles)} particle(s) of {element.name_short}.')
                     element.particles = []
+                    self.__update_particle_index(element)
             elif element.abstract and element.ref is not None:
                 log_write('')
                 log_write(f'{element.name_short} ({element.type_short}) is abstract and has a reference.')
@@ -1477,24 +1617,25 @@ class SchemaAnalyzer(object):
 
                             parent.has_abstract_sequence = True
                             parent.abstract_sequences.append((abstract_seq, p_min_occurs, p_max_occurs))
+                            self.__update_particle_index(parent)
 
+    @profiled('analysis')
     def __scan_for_derived_and_extended_elements(self):
         log_write('')
         log_write('Scan for derived and extended elements')
 
-        def find_base_type(base_type_name):
-            result = None
-            for item in self.__current_schema.elements._target_dict.values():
-                if item.prefixed_name.startswith('xs:'):
-                    continue
-                if item.type.base_type is None:
-                    continue
+        # the first element of the schema derived from every base type
+        derived_elements = {}
+        for item in self.__current_schema.elements._target_dict.values():
+            if item.prefixed_name.startswith('xs:'):
+                continue
+            if item.type.base_type is None:
+                continue
 
-                if item.type.base_type.local_name == base_type_name:
-                    result = item
-                    break
+            derived_elements.setdefault(item.type.base_type.local_name, item)
 
-            return result
+        def find_base_type(base_type_name):
+            return derived_elements.get(base_type_name, None)
 
         element: ElementData
         particle: Particle
@@ -1555,9 +1696,9 @@ class SchemaAnalyzer(object):
 
                 log_write(f'  Added abstract sequence to {element.name_short}: {abstract_seq}.')
 
+                missing_names = set(part.name for part in list_with_missing)
                 for p_index, particle in enumerate(element.particles):
-                    exist = [x for x in list_with_missing if x.name == particle.name]
-                    if len(exist) > 0:
+                    if particle.name in missing_names:
                         if not first_set:
                             first = p_index
                             first_set = True
@@ -1576,10 +1717,12 @@ class SchemaAnalyzer(object):
                     log_write(f'      {part.name} ({part.type_short})')
 
                 element.particles = new_list
+                self.__update_particle_index(element)
                 log_write(f'  Replacing particle list of {element.name_short}.')
                 log_write('')
         log_write('Done with scan for derived and extended elements')
 
+    @profiled('analysis')
     def __adjust_choice_elements(self):
         log_write('')
         log_write('Adjusting choice elements')
@@ -1598,31 +1741,288 @@ class SchemaAnalyzer(object):
                     # we may need to force this to avoid peculiar choice particle properties
                     # particle.max_occurs = 1
 
+    @profiled('analysis')
     def __apply_array_optimizations(self):
-        config_module = get_config_module()
+        config_module = self.context.get_config_module()
         parameter = self.__schema_prefix + 'array_optimizations'
         if hasattr(config_module, parameter):
             optimizations = getattr(config_module, parameter)
         else:
             return
 
+        # a path 'ParentType/ParticleName' limits the array of this particle only,
+        # a type name all arrays of this type
+        known_paths = set()
         for element in self.__generate_elements:
             particle: Particle
             for particle in element.particles:
-                if (particle.type_short in optimizations.keys()
-                   and particle.max_occurs > optimizations[particle.type_short]):
+                path = f'{element.typename}/{particle.name}'
+                if path in optimizations.keys():
+                    known_paths.add(path)
+                    limit = optimizations[path]
+                elif particle.type_short in optimizations.keys():
+                    limit = optimizations[particle.type_short]
+                else:
+                    continue
+
+                if particle.max_occurs > limit:
                     particle.max_occurs_old = particle.max_occurs
-                    particle.max_occurs = optimizations[particle.type_short]
+                    particle.max_occurs = limit
                     particle.max_occurs_was_changed = True
                     log_write(f'{particle.name} max_occurs changed from {particle.max_occurs_old} to {particle.max_occurs}')
                     log_write(f'{particle.name} type {particle.type} is complex: {particle.is_complex}, was array: {particle.was_array}')
 
+        for path in optimizations.keys():
+            if '/' in path and path not in known_paths:
+                log_write_error(f'Array optimization {path} of schema {self.__schema_prefix} matches no particle')
+
+    @profiled('analysis')
+    def __apply_message_selection(self):
+        """
+            This function computes the elements reachable from the messages selected in the config,
+            separately for the decoder and the encoder. Messages are the root elements and the particles
+            of the namespace elements (e.g. the BodyType). Messages which are not selected stay in the
+            grammars, so the event codes are not changed, but no types and coder functions are generated
+            for them. A root or namespace element without any selected message is not pruned.
+        """
+        self.__selected_messages.update(get_messages_parameter_for_schema(self.__schema_prefix))
+        if len(self.__selected_messages) == 0:
+            return
+
+        elements = {}
+        for element in self.__generate_elements:
+            elements.setdefault(element.typename, element)
+
+        root_names = [element.name_short for element in self.__root_elements]
+        namespace_elements = [element for element in self.__generate_elements if element.is_in_namespace_elements]
+        message_names = set(root_names)
+        for element in namespace_elements:
+            message_names.update(particle.name for particle in element.particles)
+
+        for name, direction in self.__selected_messages.items():
+            if name not in message_names:
+                log_write_error(f'Selected message {name} is neither a root element nor a namespace element '
+                                f'particle of schema {self.__schema_prefix}')
+            if direction not in CODER_DIRECTIONS and direction != 'both':
+                log_write_error(f'Selected message {name} has unknown direction {direction}, '
+                                f'expected one of {CODER_DIRECTIONS} or both')
+
+        def _is_pruned(names, name, direction):
+            # only the messages of a list with at least one selected message are pruned
+            if not any(item in self.__selected_messages for item in names):
+                return False
+
+            return self.__selected_messages.get(name) not in [direction, 'both']
+
+        fragments = []
+        if self.config['generate_fragments'] == 1:
+            for name in get_fragment_parameter_for_schema(self.__schema_prefix):
+                for fragment in self.__known_fragments.values():
+                    if fragment.name == name:
+                        fragments.append(fragment.name if fragment.type == 'AnonType' else fragment.type)
+
+        for direction in CODER_DIRECTIONS:
+            pruned = set()
+            for element in self.__root_elements:
+                if _is_pruned(root_names, element.name_short, direction):
+                    pruned.add(element.name_short)
+            for element in namespace_elements:
+                names = [particle.name for particle in element.particles]
+                pruned.update(name for name in names if _is_pruned(names, name, direction))
+            self.__pruned_messages[direction] = pruned
+
+            # the fragments are always generated, they have no event codes of their own
+            reachable = set()
+            stack = [element.typename for element in self.__root_elements if element.name_short not in pruned]
+            stack.extend(fragments)
+            while stack:
+                typename = stack.pop()
+                if typename in reachable or typename not in elements:
+                    continue
+
+                reachable.add(typename)
+                element = elements[typename]
+                for particle in element.particles:
+                    if element.is_in_namespace_elements and particle.name in pruned:
+                        continue
+                    stack.append(particle.typename_simple)
+
+            self.__pruned_elements[direction] = set(elements.keys()) - reachable
+            log_write(f'Message subset for {direction}: {len(reachable)} of {len(elements)} elements, '
+                      f'pruned messages {sorted(pruned)}')
+
+        # the types are generated if one of the coders needs them
+        for element in list(self.__generate_elements):
+            if all(element.typename in self.__pruned_elements[item] for item in CODER_DIRECTIONS):
+                self.__generate_elements.remove(element)
+                for key in [key for key, value in self.__known_elements.items() if value == element.typename]:
+                    del self.__known_elements[key]
+
+    def __get_default_length(self, particle: Particle):
+        if particle.value_parameter_name == 'bytes':
+            return self.config['byte_array_max_length']
+
+        return self.config['string_max_length']
+
+    def __get_length_sizes(self, particle: Particle):
+        """
+            Returns the size of the characters or bytes array of the particle with the global
+            default length and with the length of the field, like the defines of the datatypes.
+        """
+        if particle.is_complex or particle.define_for_base_type == '':
+            return 0, 0
+
+        if particle.value_parameter_name == 'bytes':
+            default_size = self.config['byte_array_max_length']
+            size = particle.max_length
+        else:
+            default_size = self.config['string_max_length'] + 1  # ASCII_EXTRA_CHAR
+            size = particle.max_length + 1 if particle.base_type == 'string' else particle.max_length
+
+        if particle.max_length <= 0:
+            size = default_size
+
+        return default_size, size
+
+    @profiled('analysis')
+    def __apply_max_lengths(self):
+        """
+            This function applies the field lengths of the config (key is the element or type name) and
+            the global clamp to the characters and bytes particles. The lengths of the config cannot exceed
+            the maxLength facet of the schema. Particles sharing the same define get the largest of their
+            lengths, since the define sizes all of them.
+        """
+        max_lengths = get_max_lengths_parameter_for_schema(self.__schema_prefix)
+        clamp = self.config['max_length_clamp']
+
+        defines = {}
+        seen = set()
+        for element in self.__generate_elements:
+            particle: Particle
+            for particle in element.particles:
+                if particle.is_complex or particle.define_for_base_type == '' or id(particle) in seen:
+                    continue
+
+                seen.add(id(particle))
+
+                length = max_lengths.get(particle.name, max_lengths.get(particle.type_short, 0))
+                if 0 < particle.schema_max_length < length:
+                    log_write_error(f'{element.name}.{particle.name} length {length} of the config exceeds '
+                                    f'the maxLength {particle.schema_max_length} of the schema')
+                    length = particle.schema_max_length
+
+                if length > 0 and length != particle.max_length:
+                    log_write(f'{element.name}.{particle.name} max_length changed from {particle.max_length} to {length}')
+                    particle.max_length = length
+
+                if clamp > 0:
+                    length = particle.max_length if particle.max_length > 0 else self.__get_default_length(particle)
+                    if length > clamp:
+                        log_write(f'{element.name}.{particle.name} max_length clamped from {length} to {clamp}')
+                        particle.max_length = clamp
+
+                defines.setdefault(particle.prefixed_define_for_base_type, []).append(particle)
+
+        for define, particles in defines.items():
+            lengths = set(particle.max_length for particle in particles)
+            if len(lengths) == 1:
+                continue
+
+            length = max(lengths)
+            if min(lengths) <= 0 and length <= self.__get_default_length(particles[0]):
+                length = -1
+
+            log_write(f'{define} shared by fields with lengths {sorted(lengths)}, using {length}')
+            for particle in particles:
+                particle.max_length = length
+
+    def __log_max_length_savings(self):
+        """
+            This function logs the memory saved per message by the field lengths, compared to
+            characters and bytes arrays sized with the global defaults.
+        """
+        elements = {}
+        for element in self.__generate_elements:
+            elements.setdefault(element.typename, element)
+
+        savings = {}
+
+        def _get_saved(typename):
+            if typename not in elements:
+                return 0
+            if typename in savings:
+                # a recursive type is counted once
+                return savings[typename] or 0
+
+            savings[typename] = None
+            element = elements[typename]
+            values = []
+            for particle in element.particles:
+                default_size, size = self.__get_length_sizes(particle)
+                value = default_size - size
+                if particle.is_complex:
+                    value += _get_saved(particle.typename_simple)
+                if particle.is_array:
+                    value *= particle.max_occurs
+                values.append(value)
+
+            # the messages of namespace elements are a union
+            if element.is_in_namespace_elements:
+                savings[typename] = max(values, default=0)
+            else:
+                savings[typename] = sum(values)
+
+            return savings[typename]
+
+        messages = {element.name_short: element.typename for element in self.__root_elements}
+        for element in elements.values():
+            if element.is_in_namespace_elements:
+                for particle in element.particles:
+                    messages[particle.name] = particle.typename_simple
+
+        log_write('Memory saved by field lengths compared to the global lengths (bytes per message):')
+        for name in sorted(messages.keys()):
+            if messages[name] in elements:
+                log_write(f'    {name}: {_get_saved(messages[name])}')
+
+    @profiled('analysis')
     def __prepare_for_type_generation(self):
         # Sort the list of elements to be generated by level and count
         self.__generate_elements.sort(key=lambda item: item.count, reverse=False)
         self.__generate_elements.sort(key=lambda item: item.level, reverse=True)
 
+    @profiled('analysis')
+    def __build_type_dependencies(self):
+        for element in self.__generate_elements:
+            dependencies = self.__type_dependencies.setdefault(element.typename, [])
+            for particle in element.particles:
+                if particle.is_complex:
+                    dependencies.append((particle.name, particle.typename_simple))
+
+    @profiled('analysis')
+    def __build_schema_value_lists(self):
+        for value in self.__current_schema.elements._target_dict.values():
+            if value.default_namespace:
+                self.__schema_element_names.append(value.local_name)
+
+        # enumerations of the enum types without enum list of their own
+        for element in self.__generate_elements:
+            if element.type_definition != 'enum' or element.has_enum_list:
+                continue
+
+            element_type = self.__current_schema.types.get(element.type_short)
+            if element_type is None:
+                element_type = self.__current_schema.types._target_dict.get(element.type)
+                if element_type is None:
+                    continue
+
+            self.__schema_enumerations[element.type] = list(element_type.enumeration)
+
     def write_analyzer_data_to_log(self):
+        # the analyzer data is part of the trace
+        if not msg_trace_enabled():
+            return
+
         log_write("")
         log_write_dict("KNOWN ELEMENTS", self.__known_elements)
         log_write_dict("KNOWN PARTICLES", self.__known_particles)
@@ -6,8 +6,10 @@ import copy
 from typing import List
 from cbexigen import tools_generator, tools
 from cbexigen.elementData import Particle, ElementData, Choice
-from cbexigen.elementGrammar import GrammarFlag, ElementGrammar, ElementGrammarDetail
-from cbexigen.tools_config import CONFIG_PARAMS
+from cbexigen.elementGrammar import GrammarFlag, ElementGrammar, ElementGrammarDetail, GrammarTableEvent
+from cbexigen.tools_config import CONFIG_PARAMS, GenerationContext, get_context, \
+    get_grammar_tables_parameter_for_schema
+from cbexigen.tools_profile import profiled
 from cbexigen.tools_logging import (
     log_write,
     log_write_error,
@@ -15,6 +17,7 @@ from cbexigen.tools_logging import (
     log_write_logger,
     log_deinit_logger,
     log_exists_logger,
+    msg_write,
 )
 
 # ---------------------------------------------------------------------------
@@ -23,9 +26,10 @@ from cbexigen.tools_logging import (
 
 
 class ExiBaseCoderHeader:
-    def __init__(self, parameters, enable_logging=True):
+    def __init__(self, parameters, enable_logging=True, context: GenerationContext = None):
+        self.context = context if context is not None else get_context()
         self.generator = tools_generator.get_generator()
-        self.config = CONFIG_PARAMS
+        self.config = self.context.params
         self.parameters = parameters
         self.h_params = parameters.get('h', None)
         self.logging_enabled = enable_logging
@@ -58,9 +62,10 @@ class ExiBaseCoderHeader:
 
 
 class ExiBaseCoderCode:
-    def __init__(self, parameters, analyzer_data, enable_logging=True):
+    def __init__(self, parameters, analyzer_data, enable_logging=True, context: GenerationContext = None):
+        self.context = context if context is not None else get_context()
         self.generator = tools_generator.get_generator()
-        self.config = CONFIG_PARAMS
+        self.config = self.context.params
         self.parameters = parameters
         self.c_params = parameters.get('c', None)
         self.analyzer_data = analyzer_data
@@ -76,6 +81,8 @@ class ExiBaseCoderCode:
                 log_init_logger(self.logger_name, f'{self.logger_name}.txt')
 
         self.indent = tools.get_indent()
+        # direction of the message subset the coder is generated for, set by the derived class
+        self.coder_direction = ''
 
         self.elements_generated = None
         self.elements_to_generate = None
@@ -84,6 +91,12 @@ class ExiBaseCoderCode:
         self.grammar_end_element = 0
         self.grammar_unknown = 0
         self.element_grammars = None
+        # log lines of the grammar computation, see get_element_grammars_of_types()
+        self.grammar_log_lines = None
+
+        self.use_grammar_tables = get_grammar_tables_parameter_for_schema(self.parameters['prefix']) == 1
+        self.grammar_table_rows = {}
+        self.grammar_table_events: list[GrammarTableEvent] = []
 
     # ---------------------------------------------------------------------------
     # logging functions
@@ -94,7 +107,9 @@ class ExiBaseCoderCode:
             self.logging_enabled = False
 
     def log(self, message):
-        if self.logging_enabled:
+        if self.grammar_log_lines is not None:
+            self.grammar_log_lines.append(message)
+        elif self.logging_enabled:
             log_write_logger(self.logger_name, message)
 
     # ---------------------------------------------------------------------------
@@ -138,6 +153,8 @@ class ExiBaseCoderCode:
         self.elements_to_generate = []
         for element in self.analyzer_data.generate_elements:
             if element.type_definition == 'complex':
+                if self.analyzer_data.is_element_pruned(element.typename, self.coder_direction):
+                    continue
                 self.elements_to_generate.append(element)
 
     def init_list_with_known_type_names(self):
@@ -191,29 +208,18 @@ class ExiBaseCoderCode:
 
         return False
 
-    def test_on_skip(self, element: ElementData):
-        result = False
-
-        for particle in element.particles:
-            if particle.is_complex:
-                # building particle type
-                type_name = particle.type_short
-                if type_name == 'AnonType':
-                    type_name = particle.name
-
-                if type_name not in self.elements_generated:
-                    # skip here! generate type first before we can use it
-                    result = True
-                    break
-
-        return result
+    def is_particle_pruned(self, element: ElementData, particle: Particle):
+        return self.analyzer_data.is_particle_pruned(element, particle, self.coder_direction)
 
     @staticmethod
-    def move_end_element_to_end_of_list(grammar: ElementGrammar):
+    def get_grammar_with_end_element_last(grammar: ElementGrammar):
+        # the grammars are shared by the decoder and the encoder, so the details of a copy are reordered
         if grammar.details_count > 1:
             if grammar.details[0].flag == GrammarFlag.END:
-                grammar.details.append(grammar.details[0])
-                grammar.details.remove(grammar.details[0])
+                grammar = copy.copy(grammar)
+                grammar.details = grammar.details[1:] + grammar.details[:1]
+
+        return grammar
 
     @staticmethod
     def get_start_grammar_id(grammars: List[ElementGrammar]):
@@ -444,7 +450,7 @@ class ExiBaseCoderCode:
             choice_options = self.ChoiceOptions(element, particle)
             combined_min_occurs_from_choice = \
                 choice_options.min_occurs if choice_options.particles else particle.min_occurs
-            if combined_min_occurs_from_choice == 1:
+            if combined_min_occurs_from_choice >= 1:
                 index_last_nonoptional_particle = particle_index
 
         def _particle_is_in_choice(element: ElementData, particle: Particle):
@@ -535,7 +541,8 @@ class ExiBaseCoderCode:
             def _add_particle_or_choice_list_to_details(
                     element: ElementData, grammar: ElementGrammar, particle: Particle, previous_choice_list,
                     flag=GrammarFlag.START,
-                    is_in_array_last=False, is_in_array_not_last=False, is_extra_grammar=False):
+                    is_in_array_last=False, is_in_array_not_last=False, is_extra_grammar=False,
+                    loop_max_occurs=None):
                 """
                 If a particle is part of a choice group, this adds all the group's particles
                 to the grammar at once, and remembers which group was being handled, so that
@@ -550,15 +557,73 @@ class ExiBaseCoderCode:
                             grammar.details.append(ElementGrammarDetail(flag=flag, particle=choice,
                                                                         is_in_array_last=is_in_array_last,
                                                                         is_in_array_not_last=is_in_array_not_last,
-                                                                        is_extra_grammar=is_extra_grammar))
+                                                                        is_extra_grammar=is_extra_grammar,
+                                                                        loop_max_occurs=loop_max_occurs))
                         previous_choice_list.extend(choice_options.item_names)
                 else:
-                    grammar.details.append(ElementGrammarDetail(flag=flag, particle=part,
+                    grammar.details.append(ElementGrammarDetail(flag=flag, particle=particle,
                                                                 is_in_array_last=is_in_array_last,
                                                                 is_in_array_not_last=is_in_array_not_last,
-                                                                is_extra_grammar=is_extra_grammar))
+                                                                is_extra_grammar=is_extra_grammar,
+                                                                loop_max_occurs=loop_max_occurs))
                     previous_choice_list.clear()
 
+            def _add_array_grammars(element: ElementData, particle: Particle, particle_index: int,
+                                    index_last_nonoptional_particle: int, particle_is_part_of_sequence: bool):
+                """
+                Adds the grammars following the first occurrence of an array particle.
+
+                The mandatory and the optional repetitions are coded by one grammar each, which
+                loops on itself until the number of occurrences is reached. So the number of
+                grammars does not depend on min_occurs and max_occurs of the particle.
+                """
+                nonlocal grammar
+                max_occurs = particle.max_occurs_old  # None if unbounded
+                log_write(f'Handling {particle.name} as array, min_occurs = {particle.min_occurs}, '
+                          f'max_occurs = {"unbounded" if max_occurs is None else max_occurs}')
+
+                # the grammars are shared by all events with the first occurrence of the particle
+                choice_options = self.ChoiceOptions(element, particle)
+                for index, part in enumerate(element.particles):
+                    if index == particle_index or part.name in choice_options.item_names:
+                        element.particles_array_grammar_ids[index] = self.grammar_id
+
+                if particle.max_occurs == 1:
+                    # changed from array to 1, only the one subsequent grammar with the extra occurrence
+                    _add_particle_or_choice_list_to_details(element, grammar, particle, [],
+                                                            is_in_array_last=True, is_extra_grammar=True)
+                else:
+                    if particle.min_occurs > 1:
+                        # the mandatory repetitions, the loop is left after min_occurs elements
+                        _add_particle_or_choice_list_to_details(element, grammar, particle, [],
+                                                                flag=GrammarFlag.LOOP, is_in_array_not_last=True,
+                                                                loop_max_occurs=particle.min_occurs)
+                        self.append_to_element_grammars(grammar, element.typename)
+                        grammar = self.create_empty_grammar()
+
+                    min_occurs = max(particle.min_occurs, 1)
+                    if max_occurs is not None and max_occurs <= min_occurs:
+                        return
+
+                    # the optional repetitions, a single one needs no loop
+                    if max_occurs == min_occurs + 1:
+                        _add_particle_or_choice_list_to_details(element, grammar, particle, [],
+                                                                is_in_array_last=True)
+                    else:
+                        _add_particle_or_choice_list_to_details(element, grammar, particle, [],
+                                                                flag=GrammarFlag.LOOP, is_in_array_last=True,
+                                                                loop_max_occurs=max_occurs)
+
+                # an optional repetition is followed by the subsequent particles
+                _add_subsequent_grammar_details(element, particle, particle_index + 1,
+                                                index_last_nonoptional_particle,
+                                                particle_is_part_of_sequence,
+                                                is_recursion=True)
+                # the recursion may have appended the grammar already
+                if grammar.details_count > 0:
+                    self.append_to_element_grammars(grammar, element.typename)
+                    grammar = self.create_empty_grammar()
+
             previous_choice_list = []  # to check whether this choice has already been handled
 
             # for the current particle, check all successors in the particle list
@@ -617,49 +682,24 @@ class ExiBaseCoderCode:
                             n_to_skip.add(n+1+i)
                             log_write_error(f"Skipping subsequent particles {n_to_skip} for particle '{part.name}'")
                 else:
-                    # arrays
-                    _max = part.max_occurs_old if part.max_occurs_old is not None else part.max_occurs
-                    if part.max_occurs == 1:  # changed from array to 1
-                        _max = 2  # only create the one subsequent grammar (START, END)
-                    log_write(f'Handling {part.name} as arrays, _max = {_max}')
-
-                    add_extra = (part.max_occurs >= 1 and part.max_occurs_was_changed)
-                    skip_to_end = False  # for LOOP, do not create grammar for subsequent repetitions
-                    for m in range(1, _max + 1):
-                        if skip_to_end:
-                            continue
-                        if m < _max:
-                            # flag=Grammar.LOOP indicates that the _next_ grammar will be the same as this one
-                            #
-                            # Note: We do not loop on the mandatory elements of an array, it would require extra
-                            # logic, and we have no min_occurs larger than 2 (i.e. no large repetition of mandatory
-                            # elements) anyway in our existing standards.
-
-                            if m > 1 and m > part.min_occurs - 1 and (part.max_occurs_old is None or m < part.max_occurs_old):
-                                flag = GrammarFlag.LOOP
-                                skip_to_end = True
-                            else:
-                                flag = GrammarFlag.START
-                            _add_particle_or_choice_list_to_details(element, grammar, part, previous_choice_list,
-                                                                    flag=flag, is_in_array_not_last=True)
-                        else:
-                            # final array grammar
-                            flag = GrammarFlag.START
-                            _add_particle_or_choice_list_to_details(element, grammar, part, previous_choice_list,
-                                                                    flag=flag, is_in_array_last=True,
-                                                                    is_extra_grammar=add_extra)
-                        if m > part.min_occurs and m > 1:
-                            # this is an optional occurrence (and grammar 0 already contains END),
-                            # so recurse with the subsequent particles
-                            _add_subsequent_grammar_details(element, particle, n + 1,
-                                                            index_last_nonoptional_particle,
-                                                            particle_is_part_of_sequence,
-                                                            is_recursion=True)
+                    # arrays: only the first occurrence is an event of this grammar, the repetitions
+                    # are coded by the grammars of the array particle itself (see below)
+                    _add_particle_or_choice_list_to_details(element, grammar, part, previous_choice_list,
+                                                            is_in_array_not_last=True)
 
-                        self.append_to_element_grammars(grammar, element.typename)
-                        grammar = self.create_empty_grammar()
+                    # non-optional or last particle in element: end of grammar list
+                    choice_options = self.ChoiceOptions(element, part)
+                    part_min = choice_options.min_occurs if choice_options.particles else 0
+                    if part.min_occurs >= 1 or part_min >= 1 or (n == len(element.particles) - 1):
+                        if not is_recursion:
+                            # end of grammar for current particle
+                            self.append_to_element_grammars(grammar, element.typename)
+                            grammar = self.create_empty_grammar()
+                        break
 
-                    break
+            if not is_recursion and (particle.max_occurs > 1 or particle.max_occurs_was_changed):
+                _add_array_grammars(element, particle, particle_index, index_last_nonoptional_particle,
+                                    particle_is_part_of_sequence)
 
             element.particles_next_grammar_ids[particle_index] = self.grammar_id
 
@@ -740,9 +780,8 @@ class ExiBaseCoderCode:
             # case 1: just one element, START as singular grammar detail
             if len_details == 1 and grammar.details[0].flag_is_start_or_loop:
                 grammar.details[0].event_index = 0
-                if grammar.details[0].flag == GrammarFlag.LOOP:
-                    # the next grammar is this grammar in a loop scenario
-                    grammar.details[0].next_grammar = grammar.grammar_id
+                if grammar.details[0].is_in_array_not_last or grammar.details[0].is_in_array_last:
+                    self.__set_array_next_grammars(grammars, idx_grammar, grammar.details[0], element)
                 else:
                     # the next grammar must be that of the subsequent particle
                     grammar.details[0].next_grammar = grammars[idx_grammar + 1].grammar_id
@@ -778,55 +817,18 @@ class ExiBaseCoderCode:
                                     ]))
 
                     elif grammar_detail.flag_is_start_or_loop:
-                        # find the particle's index in the element
-                        # FIXME can this break on repeated occurrences, as in PGPKeyDataType?
-                        part_index: int = None
-                        part: Particle
-                        for part_index, part in enumerate(element.particles):
-                            if grammar_detail.particle == part:
-                                break
-
-                        def _is_final_particle(element: ElementData, pindex: int) -> bool:
-                            # particle is the last one, or is in the same choice group as the last one
-                            if grammar_detail.is_in_array_not_last:
-                                return False
-                            if pindex == len(element.particles) - 1:
-                                return True
-                            choice_options = self.ChoiceOptions(element, element.particles[-1])
-                            if choice_options.particles:
-                                if element.particles[pindex] in choice_options.particles:
-                                    return True
-                            if choice_options.choice_sequences:
-                                if pindex == len(element.particles) - 1 - choice_options.number_of_particles_to_skip:
-                                    return True
-                            return False
-
-                        if end_elem_detail_index >= 0 and len_details == 2:
-                            if grammar_detail.is_in_array_last:
-                                if _is_final_particle(element, part_index):
-                                    grammar_detail.next_grammar = self.grammar_end_element
-                                else:
-                                    grammar_detail.next_grammar = element.particles_next_grammar_ids[part_index]
-                            else:
-                                if grammar_detail.flag == GrammarFlag.START:
-                                    grammar_detail.next_grammar = grammars[idx_grammar + 1].grammar_id
-                                else:
-                                    # LOOP
-                                    grammar_detail.next_grammar = grammar.grammar_id
-                                    grammar_detail.next_grammar_out = grammars[idx_grammar + 1].grammar_id
-
+                        if grammar_detail.is_in_array_not_last or grammar_detail.is_in_array_last:
+                            self.__set_array_next_grammars(grammars, idx_grammar, grammar_detail, element)
+                        elif end_elem_detail_index >= 0 and len_details == 2:
+                            grammar_detail.next_grammar = grammars[idx_grammar + 1].grammar_id
                         else:
+                            part_index = self.__get_particle_index(element, grammar_detail.particle)
                             if part_index is not None:
-                                if _is_final_particle(element, part_index):
+                                if self.__is_final_particle(element, part_index):
                                     # next grammar is always END for the final particle
                                     grammar_detail.next_grammar = self.grammar_end_element
                                 else:
-                                    if grammar_detail.is_in_array_not_last:
-                                        grammar_detail.next_grammar = grammars[idx_grammar + 1].grammar_id
-                                    elif grammar_detail.is_in_array_last:
-                                        grammar_detail.next_grammar = grammars[idx_grammar + 1].grammar_id
-                                    else:
-                                        grammar_detail.next_grammar = element.particles_next_grammar_ids[part_index]
+                                    grammar_detail.next_grammar = element.particles_next_grammar_ids[part_index]
                             else:
                                 log_write_error("Failed to find element particle for " +
                                                 f"{grammar_detail.particle.name}")
@@ -851,6 +853,265 @@ class ExiBaseCoderCode:
                         # the END element gets ERROR as next grammar
                         grammar_detail.next_grammar = grammars[len_grammars - 1].grammar_id
 
+    @staticmethod
+    def __get_particle_index(element: ElementData, particle: Particle):
+        # find the particle's index in the element
+        # FIXME can this break on repeated occurrences, as in PGPKeyDataType?
+        part_index: int = None
+        part: Particle
+        for part_index, part in enumerate(element.particles):
+            if particle == part:
+                break
+
+        return part_index
+
+    def __is_final_particle(self, element: ElementData, pindex: int) -> bool:
+        # particle is the last one, or is in the same choice group as the last one
+        if pindex == len(element.particles) - 1:
+            return True
+        choice_options = self.ChoiceOptions(element, element.particles[-1])
+        if choice_options.particles:
+            if element.particles[pindex] in choice_options.particles:
+                return True
+        if choice_options.choice_sequences:
+            if pindex == len(element.particles) - 1 - choice_options.number_of_particles_to_skip:
+                return True
+        return False
+
+    def __set_array_next_grammars(self, grammars: List[ElementGrammar], idx_grammar: int,
+                                  detail: ElementGrammarDetail, element: ElementData):
+        grammar = grammars[idx_grammar]
+        part_index = self.__get_particle_index(element, detail.particle)
+        # the grammar following the array particle
+        if self.__is_final_particle(element, part_index):
+            next_grammar_out = self.grammar_end_element
+        else:
+            next_grammar_out = element.particles_next_grammar_ids[part_index]
+
+        if detail.flag == GrammarFlag.START:
+            if detail.is_in_array_not_last:
+                # first occurrence, continue with the repetitions of the array particle
+                detail.next_grammar = element.particles_array_grammar_ids[part_index]
+            else:
+                # single optional repetition
+                detail.next_grammar = next_grammar_out
+        else:
+            # LOOP, the grammar is repeated until loop_max_occurs elements are coded
+            detail.next_grammar = grammar.grammar_id
+            if detail.loop_max_occurs is None:
+                return
+
+            if detail.is_in_array_not_last and idx_grammar + 1 < len(grammars) and \
+                    any(item.particle == detail.particle and item.is_in_array_last
+                        for item in grammars[idx_grammar + 1].details):
+                # the mandatory repetitions are followed by the optional repetitions
+                detail.next_grammar_out = grammars[idx_grammar + 1].grammar_id
+            else:
+                detail.next_grammar_out = next_grammar_out
+
+    def get_element_grammars_of_types(self, elements: List[ElementData]):
+        """
+            Returns the grammars of the given types in the order of generation, as list of
+            the grammars and the log lines of every type. The grammar ids are numbered over
+            all types, so the grammars are computed once per order and shared with the other
+            coder of the schema, which renders its events from the same grammars.
+        """
+        key = tuple(element.typename for element in elements)
+        if key not in self.analyzer_data.element_grammars:
+            self.analyzer_data.element_grammars[key] = self.__generate_grammars_of_types(elements)
+
+        return self.analyzer_data.element_grammars[key]
+
+    @profiled('grammars')
+    def __generate_grammars_of_types(self, elements: List[ElementData]):
+        result = []
+        self.reset_grammar_ids()
+
+        for element in elements:
+            # the log lines are kept with the grammars, so every coder writes them to its log
+            self.grammar_log_lines = []
+            self.log(f'Grammar for {element.typename}')
+            self.log(element.element_comment)
+            self.log(element.particle_comment)
+
+            # determine grammar ids for calculating bits to read from stream
+            self.generate_element_grammars(element)
+
+            if self.grammar_end_element == 0:
+                self.grammar_end_element = self.grammar_id
+                self.grammar_unknown = self.grammar_id + 1
+                self.grammar_id += 2
+
+            self.append_end_and_unknown_grammars(element.typename)
+
+            self.log('')
+            self.generate_event_info(self.element_grammars, element)
+            self.log('')
+
+            result.append((self.element_grammars, self.grammar_log_lines))
+
+        self.grammar_log_lines = None
+        self.element_grammars = None
+
+        return result
+
+    def is_characters_event_mergeable(self, detail: ElementGrammarDetail):
+        """
+            Returns True if the type content of the event starts with the characters event (CH) and the type
+            templates of the decoder and the encoder can take it as read or written with the event code.
+            Both coders merge the event codes by this decision only, so they agree on the merged events.
+        """
+        particle = detail.particle
+        if particle is None or (detail.is_any and detail.any_is_dummy):
+            return False
+
+        # DecodeTypeEnum and EncodeTypeEnum
+        if particle.is_enum:
+            return not particle.is_array and not particle.is_attribute
+        # DecodeTypeRestrictedInt, DecodeTypeBoolean and EncodeTypeRestricted, EncodeType(Unsigned)Byte,
+        # EncodeTypeBoolean. The other integers are read by the static decoder functions with their CH event.
+        if particle.integer_base_type and particle.integer_base_type != 'char':
+            return particle.type_is_restricted_int or particle.integer_base_type in ['boolean', 'int8', 'uint8']
+        if particle.typename not in self.analyzer_data.schema_builtin_types.keys() or particle.is_complex:
+            return False
+
+        # DecodeTypeString and EncodeTypeString
+        return (particle.simple_type_is_string and particle.max_occurs == 1 and
+                not (particle.is_attribute or particle.is_simple_content))
+
+    @staticmethod
+    def is_loop_breakout(detail: ElementGrammarDetail):
+        # unbounded arrays don't need to break out of the loop
+        return detail.flag == GrammarFlag.LOOP and detail.loop_max_occurs is not None
+
+    # ---------------------------------------------------------------------------
+    # grammar chain helper functions
+    # ---------------------------------------------------------------------------
+    @staticmethod
+    def is_straight_grammar(grammar: ElementGrammar):
+        # a grammar with a single START event of a non array particle always continues with the same grammar
+        if grammar.details_count != 1:
+            return False
+
+        detail = grammar.details[0]
+        return (detail.flag == GrammarFlag.START and detail.particle is not None and not detail.is_any and
+                not detail.particle.is_array and detail.next_grammar_out < 0 and detail.next_grammar >= 0)
+
+    def get_grammar_chains(self, grammars: List[ElementGrammar]):
+        """
+            Returns the chains of grammars which are coded as straight-line code and the
+            ids of the grammars which need no case of their own.
+            The key of the chains is the id of the first grammar of a chain, the value is the
+            list of the grammars following it. A grammar following in a chain is only reached
+            from its predecessor. The END grammar is appended to a chain and keeps its case if
+            it is referenced by other grammars.
+        """
+        chains = {}
+        fused_ids = []
+        if self.config['fuse_grammar_chains'] != 1:
+            return chains, fused_ids
+
+        grammars_by_id = {grammar.grammar_id: grammar for grammar in grammars}
+
+        # count the references to every grammar, the start grammar is referenced by the function itself
+        references = {self.get_start_grammar_id(grammars): 1}
+        for grammar in grammars:
+            for detail in grammar.details:
+                for next_grammar in (detail.next_grammar, detail.next_grammar_out):
+                    if next_grammar >= 0:
+                        references[next_grammar] = references.get(next_grammar, 0) + 1
+
+        followers = set()
+        for grammar in grammars:
+            if self.is_straight_grammar(grammar):
+                next_grammar = grammars_by_id.get(grammar.details[0].next_grammar)
+                if (next_grammar is not None and next_grammar is not grammar and
+                        self.is_straight_grammar(next_grammar) and references[next_grammar.grammar_id] == 1):
+                    followers.add(next_grammar.grammar_id)
+
+        for grammar in grammars:
+            if not self.is_straight_grammar(grammar) or grammar.grammar_id in followers:
+                continue
+
+            chain = []
+            next_grammar = grammars_by_id.get(grammar.details[0].next_grammar)
+            while next_grammar is not None and next_grammar.grammar_id in followers:
+                chain.append(next_grammar)
+                next_grammar = grammars_by_id.get(next_grammar.details[0].next_grammar)
+
+            if next_grammar is not None and next_grammar.details[0].flag == GrammarFlag.END and \
+                    next_grammar.details_count == 1:
+                chain.append(next_grammar)
+
+            if len(chain) > 0:
+                chains[grammar.grammar_id] = chain
+                fused_ids.extend([item.grammar_id for item in chain if references[item.grammar_id] == 1])
+
+        return chains, fused_ids
+
+    # ---------------------------------------------------------------------------
+    # grammar table helper functions
+    # ---------------------------------------------------------------------------
+    def reset_grammar_table(self):
+        self.grammar_table_rows = {}
+        self.grammar_table_events = []
+
+    def is_grammar_in_table(self, grammar_id):
+        return grammar_id in self.grammar_table_rows
+
+    def append_grammar_to_table(self, grammar: ElementGrammar, events: List[GrammarTableEvent]):
+        # returns the index of the first event of the grammar in the event table
+        first_event = len(self.grammar_table_events)
+        self.grammar_table_rows[grammar.grammar_id] = [first_event, len(events),
+                                                       grammar.bits_to_read, grammar.grammar_comment]
+        self.grammar_table_events.extend(events)
+
+        return first_event
+
+    def get_c_include_parameters(self):
+        # the table driven coder needs the interpreter, even if it is not listed in the config
+        if self.use_grammar_tables and 'exi_grammar_table.h' not in self.c_params['include_other']:
+            c_params = dict(self.c_params)
+            c_params['include_other'] = self.c_params['include_other'] + ['exi_grammar_table.h']
+            return c_params
+
+        return self.c_params
+
+    def get_grammar_table_size(self):
+        # sizeof(exi_grammar_t) and sizeof(exi_grammar_event_t) are 4 bytes each
+        grammars_count = max(self.grammar_table_rows.keys()) + 1 if len(self.grammar_table_rows) > 0 else 0
+
+        return grammars_count * 4 + len(self.grammar_table_events) * 4
+
+    def report_grammar_table(self, state_machine_lines, grammar_table_lines):
+        grammars_count = max(self.grammar_table_rows.keys()) + 1
+        msg_write(f'Grammar tables: {grammars_count} grammars, {len(self.grammar_table_events)} events, '
+                  f'{self.get_grammar_table_size()} bytes of const data.')
+        msg_write(f'Grammar tables: {grammar_table_lines} lines of coder functions instead of '
+                  f'{state_machine_lines} lines with state machines.')
+        msg_write('Grammar tables: each event costs an additional indirect handler call, '
+                  'the encoder tests optional events with an indirect condition call.')
+
+    def get_grammar_table_content(self, table_name):
+        if len(self.grammar_table_events) == 0:
+            return ''
+
+        grammars = []
+        for grammar_id in range(max(self.grammar_table_rows.keys()) + 1):
+            if grammar_id in self.grammar_table_rows:
+                first_event, event_count, bits, comment = self.grammar_table_rows[grammar_id]
+                grammars.append([first_event, event_count, bits, comment])
+            else:
+                grammars.append([0, 0, 0, f'// Grammar: ID={grammar_id}; not used'])
+
+        temp = self.generator.get_template('BaseGrammarTable.jinja')
+        content = temp.render(table_name=table_name,
+                              grammars=grammars,
+                              events=self.grammar_table_events,
+                              indent=self.indent)
+
+        return content
+
     # ---------------------------------------------------------------------------
     # general generator functions
     # ---------------------------------------------------------------------------
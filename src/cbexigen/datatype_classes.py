@@ -2,10 +2,9 @@
 # Copyright (c) 2022 - 2023 chargebyte GmbH
 # Copyright (C) 2023 Contributors to EVerest
 
-from xmlschema import XMLSchema11
 from cbexigen import tools, tools_generator, tools_logging
 from cbexigen.elementData import Particle, ElementData
-from cbexigen.tools_config import CONFIG_PARAMS, get_fragment_parameter_for_schema
+from cbexigen.tools_config import GenerationContext, get_context, get_fragment_parameter_for_schema
 from cbexigen.tools_logging import log_write_error, log_init_logger, log_write_logger, \
     log_deinit_logger, log_exists_logger
 from cbexigen.typeDefinitions import AnalyzerData, FragmentData
@@ -17,15 +16,16 @@ from cbexigen.typeDefinitions import AnalyzerData, FragmentData
 
 
 class DatatypeHeader:
-    def __init__(self, current_scheme: XMLSchema11, parameters, analyzer_data: AnalyzerData, enable_logging=True):
+    def __init__(self, parameters, analyzer_data: AnalyzerData, enable_logging=True,
+                 context: GenerationContext = None):
+        self.context = context if context is not None else get_context()
         self.generator = tools_generator.get_generator()
-        self.config = CONFIG_PARAMS
+        self.config = self.context.params
         self.parameters = parameters
         self.h_params = parameters.get('h', None)
         self.analyzer_data = analyzer_data
         self.logging_enabled = enable_logging
         self.logger_name = ''
-        self.scheme = current_scheme
 
         self.__schema_prefix = self.parameters['prefix']
         self.__is_iso20 = self.__schema_prefix.startswith('iso20_')
@@ -47,6 +47,8 @@ class DatatypeHeader:
         self.__generated_t = []
         self.__generate = []
         self.__global_define_list = {}
+        # maximum of the schema for every define, None if the schema has no maximum
+        self.__global_define_max_list = {}
 
     # ---------------------------------------------------------------------------
     # logging functions
@@ -67,6 +69,7 @@ class DatatypeHeader:
         self.__generated_t.clear()
         self.__generate.clear()
         self.__global_define_list.clear()
+        self.__global_define_max_list.clear()
 
     @staticmethod
     def __get_particle_comment(particle: Particle):
@@ -127,17 +130,25 @@ class DatatypeHeader:
     # generator helper functions
     # ---------------------------------------------------------------------------
 
+    def __set_define_maximum(self, define, maximum):
+        # a define shared by several particles allows the largest of their maximums
+        if define not in self.__global_define_max_list:
+            self.__global_define_max_list[define] = maximum
+        elif self.__global_define_max_list[define] is not None:
+            self.__global_define_max_list[define] = \
+                None if maximum is None else max(maximum, self.__global_define_max_list[define])
+
     def __generate_defines(self):
+        maximums = {key: value for key, value in self.__global_define_max_list.items() if value is not None}
         temp = self.generator.get_template('BaseDefines.jinja')
-        return temp.render(defines=self.__global_define_list)
+        return temp.render(defines=self.__global_define_list, maximums=maximums)
 
     def __generate_functions_enum(self):
         comment = '// enum for function numbers'
         enum_type = self.parameters['prefix'] + 'generatedFunctionNumbersType'
         items = []
-        for value in self.scheme.elements._target_dict.values():
-            if value.default_namespace:
-                items.append(self.parameters['prefix'] + value.local_name)
+        for name in self.analyzer_data.schema_element_names:
+            items.append(self.parameters['prefix'] + name)
         items.sort()
 
         temp = self.generator.get_template('BaseEnum.jinja')
@@ -347,6 +358,8 @@ class DatatypeHeader:
 
         if not element.has_sequence:
             for particle in element.particles:
+                if self.analyzer_data.is_particle_pruned(element, particle):
+                    continue
                 last, content = self.__get_particle_content(particle, elements)
                 struct_content += content
                 if last:
@@ -384,6 +397,8 @@ class DatatypeHeader:
 
         element: ElementData
         for element in self.analyzer_data.root_elements:
+            if self.analyzer_data.is_message_pruned(element.name_short):
+                continue
             if self.__is_iso20:
                 # TODO: The following if filters the simple types DigestValue, MgmtData and KeyName.
                 #       So it has to be checked if these types can be ignored here.
@@ -498,7 +513,14 @@ class DatatypeHeader:
             if particle.is_array:
                 if not self.__is_array_define_in_global_list(particle):
                     self.__global_define_list[particle.prefixed_define_for_array] = particle.max_occurs
+                self.__set_define_maximum(particle.prefixed_define_for_array, particle.max_occurs_old)
             if particle.define_for_base_type != '':
+                maximum = None
+                if particle.schema_max_length > 0:
+                    maximum = particle.schema_max_length
+                    if particle.base_type == 'string':
+                        maximum += 1
+                self.__set_define_maximum(particle.prefixed_define_for_base_type, maximum)
                 if not self.__is_base_type_define_in_global_list(particle):
                     if particle.max_length > 0:
                         if particle.base_type == 'string':
@@ -536,14 +558,12 @@ class DatatypeHeader:
 
                         element_list.append(f'{element.prefixed_type}_{text}')
                 else:
-                    element_type = self.scheme.types.get(element.type_short)
-                    if element_type is None:
-                        element_type = self.scheme.types._target_dict.get(element.type)
-                        if element_type is None:
-                            continue
+                    enumeration = self.analyzer_data.schema_enumerations.get(element.type, None)
+                    if enumeration is None:
+                        continue
 
                     comment = element.element_comment
-                    for value in element_type.enumeration:
+                    for value in enumeration:
                         text = value
                         for char in self.config['c_replace_chars']:
                             text = text.replace(char, '_')
@@ -557,50 +577,23 @@ class DatatypeHeader:
                 self.__generated_t.append(element.type_short)
                 self.__generate.remove(element)
 
-        curr_idx = 0
-        while_count = 0
-        while len(self.__generate) > 0:
-            # loop should not run forever
-            while_count += 1
-            if while_count > 10000:
-                log_write_error('Module datatypes: Generator loop aborted! Loop counter exceeded.')
-                break
-
-            element = self.__generate[curr_idx]
-            # building struct/element name
-            elem_name = element.typename
+        # the types are generated after the types they use
+        for element in self.analyzer_data.get_generate_order(self.__generate, self.__generated_t, 'datatypes'):
+            self.__append_to_global_define_list(element)
+            struct_content = self.__get_struct_content(element)
+            # avoid empty structs
+            if struct_content == '':
+                struct_content += '    int _unused;'
+
+            temp = self.generator.get_template('BaseStructWithFullComment.jinja')
+            content += temp.render(struct_name=element.prefixed_type,
+                                   content=struct_content,
+                                   element_comment=element.element_comment,
+                                   particle_comment=element.particle_comment)
+            content += '\n'
 
-            skip_element = False
-            for particle in element.particles:
-                if particle.is_complex:
-                    if particle.typename_simple not in self.__generated_t:
-                        # skip here! generate type first before we can use it
-                        skip_element = True
-                        break
-
-            if skip_element:
-                curr_idx += 1
-                if curr_idx > len(self.__generate):
-                    log_write_error('Module datatypes: Generator loop aborted! Index larger than existing elements.')
-                    break
-            else:
-                self.__append_to_global_define_list(element)
-                struct_content = self.__get_struct_content(element)
-                # avoid empty structs
-                if struct_content == '':
-                    struct_content += '    int _unused;'
-
-                temp = self.generator.get_template('BaseStructWithFullComment.jinja')
-                content += temp.render(struct_name=element.prefixed_type,
-                                       content=struct_content,
-                                       element_comment=element.element_comment,
-                                       particle_comment=element.particle_comment)
-                content += '\n'
-
-                # add element to list of generated ane remove from list to generate and reset element index
-                self.__generated_t.append(elem_name)
-                self.__generate.remove(element)
-                curr_idx = 0
+            # add element to list of generated
+            self.__generated_t.append(element.typename)
 
         content += '\n\n'
         content += self.__get_root_content()
@@ -641,9 +634,11 @@ class DatatypeHeader:
 
 
 class DatatypeCode:
-    def __init__(self, current_scheme, parameters, analyzer_data: AnalyzerData, enable_logging=True):
+    def __init__(self, parameters, analyzer_data: AnalyzerData, enable_logging=True,
+                 context: GenerationContext = None):
+        self.context = context if context is not None else get_context()
         self.generator = tools_generator.get_generator()
-        self.config = CONFIG_PARAMS
+        self.config = self.context.params
         self.parameters = parameters
         self.c_params = parameters.get('c', None)
         self.analyzer_data = analyzer_data
@@ -723,6 +718,8 @@ class DatatypeCode:
 
         if len(self.analyzer_data.root_elements) > 1:
             for element in self.analyzer_data.root_elements:
+                if self.analyzer_data.is_message_pruned(element.name_short):
+                    continue
                 if self.__is_iso20:
                     # TODO: The following if filters the simple types DigestValue, MgmtData and KeyName.
                     #       So it has to be checked if these types can be ignored here.
@@ -835,6 +832,8 @@ class DatatypeCode:
                     parameter_name = element.name_short
 
                 for particle in element.particles:
+                    if self.analyzer_data.is_particle_pruned(element, particle):
+                        continue
                     # TODO: check if particle is in OCCURRENCE_LIMITS_CORRECTED,
                     #       should then result in an array definition
                     if particle.max_occurs > 1:
@@ -6,7 +6,7 @@ from typing import List
 from cbexigen.base_coder_classes import ExiBaseCoderHeader, ExiBaseCoderCode
 from cbexigen import tools_generator, tools
 from cbexigen.elementData import ElementData, Particle, ContentType
-from cbexigen.elementGrammar import GrammarFlag, ElementGrammar, ElementGrammarDetail
+from cbexigen.elementGrammar import GrammarFlag, ElementGrammar, ElementGrammarDetail, GrammarTableEvent
 from cbexigen.tools_config import CONFIG_PARAMS, get_fragment_parameter_for_schema
 from cbexigen.tools_logging import log_write_error
 
@@ -16,8 +16,8 @@ from cbexigen.tools_logging import log_write_error
 
 
 class ExiDecoderHeader(ExiBaseCoderHeader):
-    def __init__(self, parameters, enable_logging=True):
-        super(ExiDecoderHeader, self).__init__(parameters=parameters, enable_logging=enable_logging)
+    def __init__(self, parameters, enable_logging=True, context=None):
+        super(ExiDecoderHeader, self).__init__(parameters=parameters, enable_logging=enable_logging, context=context)
 
         self.__schema_prefix = self.parameters['prefix']
         self.__is_iso20 = self.__schema_prefix.startswith('iso20_')
@@ -91,8 +91,9 @@ class ExiDecoderHeader(ExiBaseCoderHeader):
 
 
 class ExiDecoderCode(ExiBaseCoderCode):
-    def __init__(self, parameters, analyzer_data, enable_logging=True):
-        super(ExiDecoderCode, self).__init__(parameters, analyzer_data, enable_logging)
+    def __init__(self, parameters, analyzer_data, enable_logging=True, context=None):
+        super(ExiDecoderCode, self).__init__(parameters, analyzer_data, enable_logging, context)
+        self.coder_direction = 'decode'
 
         self.__schema_prefix = self.parameters['prefix']
         self.__is_iso20 = self.__schema_prefix.startswith('iso20_')
@@ -106,6 +107,8 @@ class ExiDecoderCode(ExiBaseCoderCode):
         self.__include_content = ''
         self.__code_content = ''
         self.__function_content = ''
+        # the characters event of a simple type is read together with the event code
+        self.__characters_event_read = False
 
     # ---------------------------------------------------------------------------
     # generator helper functions
@@ -212,6 +215,9 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_array_length=f'{element_typename}->{detail.particle.name}.arrayLen',
                                      type_array_define=detail.particle.prefixed_define_for_array,
                                      next_grammar_id=next_grammar_id,
+                                     next_grammar_id_breakout=detail.next_grammar_out,
+                                     type_loop_breakout=self.is_loop_breakout(detail),
+                                     type_array_len_schema=detail.loop_max_occurs,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -229,6 +235,7 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_value=type_value,
                                      type_option=detail.particle.is_optional,
                                      next_grammar_id=next_grammar_id,
+                                     characters_event_read=self.__characters_event_read,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -251,6 +258,7 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_int=tools.TYPE_TRANSLATION_C[detail.particle.integer_base_type],
                                      type_option=detail.particle.is_optional,
                                      next_grammar_id=next_grammar_id,
+                                     characters_event_read=self.__characters_event_read,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -271,6 +279,7 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_int=tools.TYPE_TRANSLATION_C[detail.particle.integer_base_type],
                                      type_option=detail.particle.is_optional,
                                      next_grammar_id=next_grammar_id,
+                                     characters_event_read=self.__characters_event_read,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -319,6 +328,9 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_value=type_array,
                                      type_option=detail.particle.is_optional,
                                      next_grammar_id=next_grammar_id,
+                                     next_grammar_id_breakout=detail.next_grammar_out,
+                                     type_loop_breakout=self.is_loop_breakout(detail),
+                                     type_array_len_schema=detail.loop_max_occurs,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -411,6 +423,10 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_array_length=f'{element_typename}->{detail.particle.name}.arrayLen',
                                      type_array_define=detail.particle.prefixed_define_for_array,
                                      next_grammar_id=next_grammar_id,
+                                     next_grammar_id_breakout=detail.next_grammar_out,
+                                     type_loop_breakout=self.is_loop_breakout(detail),
+                                     type_array_len_schema=detail.loop_max_occurs,
+                                     characters_event_read=self.__characters_event_read,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -421,13 +437,6 @@ class ExiDecoderCode(ExiBaseCoderCode):
             decode_comment += ' (Attribute)'
         type_array = f'{element_typename}->{detail.particle.name}.{detail.particle.value_parameter_name}'
         type_array_len = f'{element_typename}->{detail.particle.name}.{detail.particle.length_parameter_name}'
-        type_loop_breakout = (
-            detail.flag == GrammarFlag.LOOP and
-            detail.particle.max_occurs_old is not None  # unbounded (max None) arrays don't need to break out of loop
-        )
-        array_length_from_schema = detail.particle.max_occurs
-        if detail.particle.max_occurs_old != -1:
-            array_length_from_schema = detail.particle.max_occurs_old
         decode_fn = f'{CONFIG_PARAMS["decode_function_prefix"]}{detail.particle.prefixed_type}'
         next_grammar_id = detail.next_grammar
         next_grammar_id_breakout = detail.next_grammar_out
@@ -438,8 +447,8 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_define=detail.particle.prefixed_define_for_array,
                                      type_array=type_array,
                                      type_array_len=type_array_len,
-                                     type_array_len_schema=array_length_from_schema,
-                                     type_loop_breakout=type_loop_breakout,
+                                     type_array_len_schema=detail.loop_max_occurs,
+                                     type_loop_breakout=self.is_loop_breakout(detail),
                                      decode_fn=decode_fn,
                                      next_grammar_id=next_grammar_id,
                                      next_grammar_id_breakout=next_grammar_id_breakout,
@@ -463,6 +472,15 @@ class ExiDecoderCode(ExiBaseCoderCode):
 
         return decode_content
 
+    def __get_content_decode_unsupported_event(self, particle: Particle, level):
+        decode_comment = f'// {particle.name} is not part of the message subset for decoding'
+
+        temp = self.generator.get_template('DecodeTypeUnsupportedEvent.jinja')
+        decode_content = temp.render(decode_comment=decode_comment,
+                                     indent=self.indent, level=level)
+
+        return decode_content
+
     def __get_content_decode_element(self, element_typename, detail: ElementGrammarDetail, level):
         decode_comment = '// decode: element'
         if detail.particle.is_attribute:
@@ -500,6 +518,9 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_value=type_value,
                                      type_enum=type_enum,
                                      next_grammar_id=next_grammar_id,
+                                     next_grammar_id_breakout=detail.next_grammar_out,
+                                     type_loop_breakout=self.is_loop_breakout(detail),
+                                     type_array_len_schema=detail.loop_max_occurs,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -520,6 +541,7 @@ class ExiDecoderCode(ExiBaseCoderCode):
                                      type_value=type_value,
                                      type_enum=type_enum,
                                      next_grammar_id=next_grammar_id,
+                                     characters_event_read=self.__characters_event_read,
                                      indent=self.indent, level=level)
 
         return decode_content
@@ -620,38 +642,62 @@ class ExiDecoderCode(ExiBaseCoderCode):
 
         return type_content
 
+    def __is_characters_event_merged(self, grammar: ElementGrammar):
+        # the characters event (CH) of a simple type is the only event with code 0 (1 bit). If the grammar has
+        # a single event, the event code and the CH event are read with one call and compared as one value.
+        return (self.config['merge_event_codes'] == 1 and grammar.details_count == 1 and
+                self.is_characters_event_mergeable(grammar.details[0]))
+
+    def __get_bits_to_read(self, grammar: ElementGrammar):
+        if self.__is_characters_event_merged(grammar):
+            return grammar.bits_to_read + 1
+
+        return grammar.bits_to_read
+
+    @staticmethod
+    def __get_event_comment(detail: ElementGrammarDetail):
+        if detail.flag == GrammarFlag.END:
+            event_comment = f'// Event: {detail.flag}; ' + \
+                            f'next={detail.next_grammar}'
+        elif detail.particle is not None:
+            if detail.particle.abstract or detail.particle.abstract_type:
+                event_comment = (f'// Abstract element or type: {detail.particle.name}, '
+                                 f'{detail.particle.type_short} ({detail.particle.typename})')
+            else:
+                event_comment = f'// Event: {detail.flag} ({detail.particle.name}, ' + \
+                                f'{detail.particle.type_short} ({detail.particle.typename})); ' + \
+                                f'next={detail.next_grammar}'
+        else:
+            # unsupported particle which appears in the event list
+            event_comment = f'// Event: {detail.flag} (None); next={detail.next_grammar}'
+
+        return event_comment
+
     def __get_event_content(self, grammar: ElementGrammar, level):
         event_content = ''
 
         if grammar.details[0].flag != GrammarFlag.ERROR:
+            characters_event_merged = self.__is_characters_event_merged(grammar)
             detail: ElementGrammarDetail = None
             for detail in grammar.details:
-                if detail.flag == GrammarFlag.END:
-                    event_comment = f'// Event: {detail.flag}; ' + \
-                                    f'next={detail.next_grammar}'
-                elif detail.particle is not None:
-                    if detail.particle.abstract or detail.particle.abstract_type:
-                        event_comment = (f'// Abstract element or type: {detail.particle.name}, '
-                                         f'{detail.particle.type_short} ({detail.particle.typename})')
-                    else:
-                        event_comment = f'// Event: {detail.flag} ({detail.particle.name}, ' + \
-                                        f'{detail.particle.type_short} ({detail.particle.typename})); ' + \
-                                        f'next={detail.next_grammar}'
-                else:
-                    # unsupported particle which appears in the event list
-                    event_comment = f'// Event: {detail.flag} (None); next={detail.next_grammar}'
+                event_comment = self.__get_event_comment(detail)
+                event_id = detail.event_index
+                if characters_event_merged:
+                    event_id = detail.event_index << 1
+                    self.__characters_event_read = True
 
                 # currently not used, should be removed if it seems not to be useful!
                 # add_debug_code = self.get_status_for_add_debug_code(grammar.element_typename)
                 # type_parameter = CONFIG_PARAMS['decode_function_prefix'] + grammar.element_typename
                 temp = self.generator.get_template('BaseDecodeCaseEventId.jinja')
-                event_content += temp.render(event_id=detail.event_index,
+                event_content += temp.render(event_id=event_id,
                                              event_id_comment=event_comment,
                                              type_content=self.__get_type_content(grammar, detail, 5),
                                              # add_debug_code=add_debug_code,
                                              # type_parameter=type_parameter,
                                              indent=self.indent, level=level)
                 event_content += '\n'
+                self.__characters_event_read = False
 
         return self.trim_lf(event_content)
 
@@ -672,8 +718,11 @@ class ExiDecoderCode(ExiBaseCoderCode):
                 event_index = 0
                 for name in names:
                     hits = [x for x in element.particles if x.name == name]
-                    type_content = self.__get_content_decode_namespace_element(element.typename, hits[0],
-                                                                               next_grammar, level + 3)
+                    if self.is_particle_pruned(element, hits[0]):
+                        type_content = self.__get_content_decode_unsupported_event(hits[0], level + 3)
+                    else:
+                        type_content = self.__get_content_decode_namespace_element(element.typename, hits[0],
+                                                                                   next_grammar, level + 3)
 
                     event_comment = f'// Event: {hits[0].name}'
                     temp = self.generator.get_template('BaseDecodeCaseEventId.jinja')
@@ -704,27 +753,57 @@ class ExiDecoderCode(ExiBaseCoderCode):
 
         return self.trim_lf(grammar_content)
 
+    def __get_debug_parameters(self, grammar: ElementGrammar):
+        add_debug_code = 0
+        type_parameter = ''
+        for detail in grammar.details:
+            if detail.flag_is_start_or_loop and detail.particle is not None:
+                prefixed_type = detail.particle.prefixed_name
+                add_debug_code = self.get_status_for_add_debug_code(prefixed_type)
+                type_parameter = CONFIG_PARAMS['decode_function_prefix'] + prefixed_type
+                break
+
+        return add_debug_code, type_parameter
+
+    def __get_fused_grammar_content(self, chain: List[ElementGrammar], level):
+        fused_content = ''
+
+        for grammar in chain:
+            add_debug_code, type_parameter = self.__get_debug_parameters(grammar)
+            temp = self.generator.get_template('BaseDecodeFusedGrammar.jinja')
+            fused_content += temp.render(grammar_id=grammar.grammar_id,
+                                         grammar_id_comment=grammar.grammar_comment,
+                                         bits_to_read=self.__get_bits_to_read(grammar),
+                                         event_content=self.__get_event_content(grammar, level + 1),
+                                         add_debug_code=add_debug_code,
+                                         type_parameter=type_parameter,
+                                         indent=self.indent, level=level)
+
+            fused_content += '\n'
+
+        return self.trim_lf(fused_content)
+
     def __get_grammar_content(self, grammars: List[ElementGrammar], level):
         grammar_content = ''
 
+        # chains of single event grammars are decoded within the case of their first grammar
+        chains, fused_ids = self.get_grammar_chains(grammars)
+
         for grammar in grammars:
-            if grammar.details[0].flag == GrammarFlag.ERROR:
+            if grammar.details[0].flag == GrammarFlag.ERROR or grammar.grammar_id in fused_ids:
                 continue
 
-            add_debug_code = 0
-            type_parameter = ''
-            for detail in grammar.details:
-                if detail.flag_is_start_or_loop and detail.particle is not None:
-                    prefixed_type = detail.particle.prefixed_name
-                    add_debug_code = self.get_status_for_add_debug_code(prefixed_type)
-                    type_parameter = CONFIG_PARAMS['decode_function_prefix'] + prefixed_type
-                    break
+            fused_content = ''
+            if grammar.grammar_id in chains:
+                fused_content = self.__get_fused_grammar_content(chains[grammar.grammar_id], level + 1)
 
+            add_debug_code, type_parameter = self.__get_debug_parameters(grammar)
             temp = self.generator.get_template('BaseDecodeCaseGrammarId.jinja')
             grammar_content += temp.render(grammar_id=grammar.grammar_id,
                                            grammar_id_comment=grammar.grammar_comment,
-                                           bits_to_read=grammar.bits_to_read,
+                                           bits_to_read=self.__get_bits_to_read(grammar),
                                            event_content=self.__get_event_content(grammar, 4),
+                                           fused_content=fused_content,
                                            add_debug_code=add_debug_code,
                                            type_parameter=type_parameter,
                                            indent=self.indent, level=level)
@@ -733,6 +812,68 @@ class ExiDecoderCode(ExiBaseCoderCode):
 
         return self.trim_lf(grammar_content)
 
+    def __get_event_content_grammar_table(self, grammars: List[ElementGrammar], level):
+        event_content = ''
+
+        for grammar in grammars:
+            # the END and ERROR grammars are shared by all types and only added once
+            if self.is_grammar_in_table(grammar.grammar_id):
+                continue
+
+            events = []
+            if grammar.details[0].flag != GrammarFlag.ERROR:
+                # the event code is the index of the event in the grammar
+                event_count = max([detail.event_index for detail in grammar.details]) + 1
+                events = [GrammarTableEvent(event_code=code, flags='EXI_GRAMMAR_EVENT_NONE', comment='no event')
+                          for code in range(event_count)]
+
+                first_event = len(self.grammar_table_events)
+                detail: ElementGrammarDetail
+                for detail in grammar.details:
+                    event = events[detail.event_index]
+                    event.next_grammar = detail.next_grammar
+                    event.comment = f'{detail.flag} ({detail.particle_name}); next={detail.next_grammar}'
+
+                    if detail.flag == GrammarFlag.END:
+                        event.flags = 'EXI_GRAMMAR_EVENT_END'
+                        continue
+
+                    event.flags = '0'
+                    temp = self.generator.get_template('BaseDecodeCaseEventId.jinja')
+                    event_content += temp.render(event_id=first_event + detail.event_index,
+                                                 event_id_comment=self.__get_event_comment(detail),
+                                                 type_content=self.__get_type_content(grammar, detail, level + 1),
+                                                 indent=self.indent, level=level)
+                    event_content += '\n'
+
+            self.append_grammar_to_table(grammar, events)
+
+        return self.trim_lf(event_content)
+
+    def __get_function_content_grammar_table(self, element: ElementData, grammars: List[ElementGrammar]):
+        event_content = self.__get_event_content_grammar_table(grammars, 1)
+
+        temp = self.generator.get_template('DecodeGrammarTableFunction.jinja')
+        content = temp.render(element_comment=element.element_comment,
+                              particle_comment=element.particle_comment,
+                              function_name=CONFIG_PARAMS['decode_function_prefix'] + element.prefixed_type,
+                              struct_type=element.prefixed_type, parameter_name=element.typename,
+                              start_grammar_id=self.get_start_grammar_id(grammars),
+                              init_function=CONFIG_PARAMS['init_function_prefix'] + element.prefixed_type,
+                              event_content=event_content,
+                              use_event_code='eventCode' in event_content,
+                              table_name=self.__schema_prefix + 'grammar_table',
+                              add_debug_code=self.get_status_for_add_debug_code(element.prefixed_type),
+                              indent=self.indent, level=1)
+        content += '\n\n'
+
+        return content
+
+    def __uses_grammar_table(self, element: ElementData, grammars: List[ElementGrammar]):
+        # namespace elements have their own grammar content, they are always generated as state machine
+        return (self.use_grammar_tables and not element.is_in_namespace_elements and
+                self.get_start_grammar_id(grammars) >= 0)
+
     def __get_function_content(self, element: ElementData, grammars: List[ElementGrammar]):
         typename = element.typename
         content = ''
@@ -780,6 +921,7 @@ class ExiDecoderCode(ExiBaseCoderCode):
         elif len(self.analyzer_data.root_elements) > 1:
             decode_fn = []
             for elem in self.analyzer_data.root_elements:
+                pruned = self.analyzer_data.is_message_pruned(elem.name_short, self.coder_direction)
                 if self.__is_iso20:
                     # TODO: The following if filters the simple types DigestValue, MgmtData and KeyName.
                     #       Simple types has to be decoded directly and not with an decoding function.
@@ -789,16 +931,17 @@ class ExiDecoderCode(ExiBaseCoderCode):
                     prefix_name_short = f'{elem.prefix}{elem.name_short}'
                     if elem.type_definition == 'complex':
                         decode_fn.append([CONFIG_PARAMS['decode_function_prefix'] + elem.prefixed_type,
-                                          parameter_name + '->' + elem.name_short])
+                                          parameter_name + '->' + elem.name_short, pruned])
                     else:
-                        decode_fn.append([f'{CONFIG_PARAMS["decode_function_prefix"]}{prefix_name_short}', ''])
+                        decode_fn.append([f'{CONFIG_PARAMS["decode_function_prefix"]}{prefix_name_short}', '',
+                                          pruned])
                 else:
                     if elem.typename in self.analyzer_data.schema_builtin_types:
                         decode_fn.append([f'{CONFIG_PARAMS["decode_function_prefix"]}{elem.prefix}{elem.name_short}',
-                                          f'{parameter_name}->{elem.prefix}{elem.name_short}'])
+                                          f'{parameter_name}->{elem.prefix}{elem.name_short}', pruned])
                     else:
                         decode_fn.append([CONFIG_PARAMS['decode_function_prefix'] + elem.prefixed_type,
-                                          parameter_name + '->' + elem.typename])
+                                          parameter_name + '->' + elem.typename, pruned])
 
             decode_fn.sort()
 
@@ -904,7 +1047,8 @@ class ExiDecoderCode(ExiBaseCoderCode):
         decode_fn = []
         for fragment in self.analyzer_data.known_fragments.values():
             if 'xmldsig' in fragment.namespace.casefold():
-                if fragment.type in self.analyzer_data.known_elements.values():
+                if fragment.type in self.analyzer_data.known_elements.values() and \
+                        not self.analyzer_data.is_element_pruned(fragment.type, self.coder_direction):
                     function = f'{CONFIG_PARAMS["decode_function_prefix"]}{self.__schema_prefix}{fragment.type}'
                     parameter = f'{parameter_name}->{fragment.name}'
                     decode_fn.append([fragment.name, fragment.namespace, function, parameter])
@@ -947,70 +1091,58 @@ class ExiDecoderCode(ExiBaseCoderCode):
                             f'{self.__class__.__name__}.{self.generate_file.__name__}')
             return
 
-        self.__include_content = tools_generator.get_includes_content(self.c_params)
+        self.__include_content = tools_generator.get_includes_content(self.get_c_include_parameters())
         self.__code_content = ''
         self.__function_content = ''
 
         analyzed_elements = {}
         static_declarations = []
+        state_machine_lines = 0
+        grammar_table_lines = 0
 
         self.reset_grammar_ids()
+        self.reset_grammar_table()
         self.init_lists_for_generating_elements()
         self.init_list_with_known_type_names()
 
-        curr_idx = 0
-        while_count = 0
-        while len(self.elements_to_generate) > 0:
-            # loop should not run forever
-            while_count += 1
-            if while_count > 10000:
-                log_write_error('Module decoder: Generator loop aborted! Loop counter exceeded.')
-                break
-
-            element: ElementData = self.elements_to_generate[curr_idx]
+        # the types are generated after the types they use
+        elements = self.analyzer_data.get_generate_order(self.elements_to_generate, self.elements_generated,
+                                                         'decoder', self.coder_direction)
+        for element, (grammars, log_lines) in zip(elements, self.get_element_grammars_of_types(elements)):
             elem_typename = element.typename
-            skip_element = self.test_on_skip(element)
-
-            if skip_element:
-                curr_idx += 1
-                if curr_idx > len(self.elements_to_generate):
-                    log_write_error('Module decoder: Generator loop aborted! Index larger than existing elements.')
-                    break
-            else:
-                self.log(f'Grammar for {elem_typename}')
-                self.log(element.element_comment)
-                self.log(element.particle_comment)
+            for line in log_lines:
+                self.log(line)
 
-                # get forward declarations
-                static_declarations.append(self.get_function_declaration(elem_typename, True))
+            # get forward declarations
+            static_declarations.append(self.get_function_declaration(elem_typename, True))
 
-                # determine grammar ids for calculating bits to read from stream
-                self.generate_element_grammars(element)
-
-                if self.grammar_end_element == 0:
-                    self.grammar_end_element = self.grammar_id
-                    self.grammar_unknown = self.grammar_id + 1
-                    self.grammar_id += 2
-
-                self.append_end_and_unknown_grammars(element.typename)
-
-                self.log('')
-                self.generate_event_info(self.element_grammars, element)
-                self.log('')
-                analyzed_elements[elem_typename] = self.element_grammars
+            self.element_grammars = grammars
+            analyzed_elements[elem_typename] = self.element_grammars
 
+            if self.__uses_grammar_table(element, self.element_grammars):
+                # the state machine is only rendered for the size comparison of the report
+                state_machine_lines += self.__get_function_content(element, self.element_grammars).count('\n')
+                function_content = self.__get_function_content_grammar_table(element, self.element_grammars)
+                grammar_table_lines += function_content.count('\n')
+                self.__function_content += function_content
+            else:
                 self.__function_content += self.__get_function_content(element, self.element_grammars)
 
-                # add element to list of generated ane remove from list to generate and reset element index
-                self.elements_generated.append(elem_typename)
-                self.elements_to_generate.remove(element)
-                curr_idx = 0
+            # add element to list of generated
+            self.elements_generated.append(elem_typename)
 
         # from here on all forward declarations are known
         for line in static_declarations:
             self.__code_content += line + '\n'
 
         self.__code_content += '\n'
+        if self.use_grammar_tables:
+            grammar_table_content = self.get_grammar_table_content(self.__schema_prefix + 'grammar_table')
+            if grammar_table_content != '':
+                self.__code_content += grammar_table_content
+                self.__code_content += '\n\n'
+                self.report_grammar_table(state_machine_lines, grammar_table_lines)
+
         self.__code_content += self.__function_content
 
         self.__code_content += '\n'
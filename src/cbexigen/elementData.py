@@ -2,7 +2,7 @@
 # Copyright (c) 2022 - 2023 chargebyte GmbH
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from enum import Enum
 from cbexigen.tools_config import CONFIG_PARAMS
 
@@ -13,8 +13,104 @@ class ContentType(Enum):
     xmldsig = 3
 
 
+class precomputed:
+    """
+        Property of the analyzer output which is computed from the fields as long as the analysis
+        changes them. When the object is frozen, the value is computed once and stored in a slot.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.slot_name = '_' + func.__name__
+        self.slot = None
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if instance.frozen:
+            return self.slot.__get__(instance, owner)
+
+        return self.func(instance)
+
+
+def slotted(*extra_slots):
+    """
+        Class decorator for the dataclasses of the analyzer and the grammars, applied after @dataclass.
+        The class is created again with slots for its fields, the given extra attributes and the
+        precomputed properties, so the instances have no dict. The extra attributes are no fields,
+        they have to be set by __init__ or __post_init__.
+    """
+    def decorator(cls):
+        names = tuple(item.name for item in fields(cls))
+        properties = [value for value in cls.__dict__.values() if isinstance(value, precomputed)]
+
+        cls_dict = dict(cls.__dict__)
+        for name in names + extra_slots + ('__dict__', '__weakref__'):
+            cls_dict.pop(name, None)
+        cls_dict['__slots__'] = names + extra_slots + tuple(item.slot_name for item in properties)
+
+        slotted_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+        for item in properties:
+            item.slot = slotted_cls.__dict__[item.slot_name]
+
+        return slotted_cls
+
+    return decorator
+
+
+class AnalyzerOutput:
+    """
+        Base class of the analyzer output. The objects are frozen after the analysis, then the
+        precomputed properties are stored and no attribute can be changed anymore.
+        The slots are pickled for the analyzer data cache.
+    """
+    __slots__ = ('frozen',)
+
+    __SLOT_NAMES = {}
+
+    def __new__(cls, *args, **kwargs):
+        instance = super().__new__(cls)
+        object.__setattr__(instance, 'frozen', False)
+        return instance
+
+    def __setattr__(self, name, value):
+        if self.frozen:
+            raise AttributeError(f'{type(self).__name__} is frozen after the analysis, {name} cannot be changed')
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def __get_slot_names(cls):
+        # the precomputed properties are not pickled, they are computed again when unpickled
+        if cls not in AnalyzerOutput.__SLOT_NAMES:
+            properties = [item.slot_name for item in cls.__dict__.values() if isinstance(item, precomputed)]
+            AnalyzerOutput.__SLOT_NAMES[cls] = [name for item in reversed(cls.__mro__)
+                                                for name in item.__dict__.get('__slots__', ())
+                                                if name not in properties]
+        return AnalyzerOutput.__SLOT_NAMES[cls]
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__get_slot_names() if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            if name != 'frozen':
+                object.__setattr__(self, name, value)
+        if state.get('frozen', False):
+            self.freeze()
+
+    def freeze(self):
+        if self.frozen:
+            return
+
+        for item in type(self).__dict__.values():
+            if isinstance(item, precomputed):
+                object.__setattr__(self, item.slot_name, item.func(self))
+        object.__setattr__(self, 'frozen', True)
+
+
+@slotted('parent_sequence', 'parent_choice_sequence_number', 'simple_content_names')
 @dataclass
-class Particle:
+class Particle(AnalyzerOutput):
     prefix: str = ''
     name: str = None
     type: str = None
@@ -27,6 +123,9 @@ class Particle:
     _max_occurs_old: int = -1  # hidden so that we can implement a verbose getter/setter
     min_length: int = -1
     max_length: int = -1
+    # maxLength facet of the schema, -1 without facet. max_length may be changed by the config
+    # or be a default length, only the facet limits the lengths of the config.
+    schema_max_length: int = -1
     min_value: int = 0
     max_value: int = -1
     abstract: bool = False
@@ -43,12 +142,9 @@ class Particle:
     # additional flag if parent content model is sequence and changed occurrence
     parent_model_changed_restrictions: bool = False
     parent_has_sequence: bool = False
-    parent_sequence = []
     parent_has_choice_sequence: bool = False
-    parent_choice_sequence_number = -1
     parent_type_is_empty: bool = False
     has_simple_content: bool = False
-    simple_content_names = []
     integer_min: int = -1
     integer_max: int = -1
     integer_bit_size: int = -1
@@ -57,6 +153,12 @@ class Particle:
     # additional info for the anyType particle
     process_content: str = None
 
+    def __post_init__(self):
+        # no fields, so they are neither compared nor part of the representation
+        self.parent_sequence = []
+        self.parent_choice_sequence_number = -1
+        self.simple_content_names = []
+
     @property
     def max_occurs_old(self):
         if self._max_occurs_old is None or self._max_occurs_old != -1:
@@ -67,7 +169,7 @@ class Particle:
     def max_occurs_old(self, value):
         self._max_occurs_old = value
 
-    @property
+    @precomputed
     def typename(self) -> str:
         result = self.type_short
         if self.base_type != '':
@@ -78,18 +180,18 @@ class Particle:
 
         return result
 
-    @property
+    @precomputed
     def typename_simple(self):
         if self.type_short == 'AnonType':
             return self.name
 
         return self.type_short
 
-    @property
+    @precomputed
     def length_parameter_name(self) -> str:
         return self.value_parameter_name + 'Len'
 
-    @property
+    @precomputed
     def value_parameter_name(self) -> str:
         if self.is_array:
             if self.is_enum:
@@ -114,11 +216,11 @@ class Particle:
 
         return 'characters'
 
-    @property
+    @precomputed
     def prefixed_name(self):
         return self.prefix + self.name
 
-    @property
+    @precomputed
     def prefixed_type(self):
         return self.prefix + self.typename_simple
 
@@ -147,7 +249,7 @@ class Particle:
         # should probably be set by the analyzer, and not via name
         return self.name == 'ANY'
 
-    @property
+    @precomputed
     def simple_type(self) -> str:
         result = self.type_short
 
@@ -172,17 +274,17 @@ class Particle:
 
         return result
 
-    @property
+    @precomputed
     def simple_type_is_string(self) -> bool:
         # for now the uri is treated as string
         return self.simple_type == 'string' or self.simple_type == 'uri'
 
-    @property
+    @precomputed
     def simple_type_is_binary(self) -> bool:
         # for now the hex is treated as binary
         return self.simple_type == 'binary' or self.simple_type == 'hex'
 
-    @property
+    @precomputed
     def bit_count_for_coding(self) -> int:
         result = 0
 
@@ -205,7 +307,7 @@ class Particle:
 
         return result
 
-    @property
+    @precomputed
     def type_is_restricted_int(self) -> bool:
         """
         If the associated schema datatype is directly or indirectly derived from xsd:integer
@@ -289,6 +391,8 @@ class Particle:
 
 
 class Choice:
+    __slots__ = ('is_multi_choice', 'multi_choice_max', 'choice_items', 'choice_sequences', 'min_occurs')
+
     def __init__(self):
         self.is_multi_choice: int = 0
         self.multi_choice_max: int = 0
@@ -305,8 +409,10 @@ class Choice:
         return len(self.choice_sequences)
 
 
+@slotted('abstract_sequences', 'particles', 'choices', 'sequences', 'is_in_namespace_elements', 'enum_list',
+         'particles_next_grammar_ids', 'particles_array_grammar_ids')
 @dataclass
-class ElementData:
+class ElementData(AnalyzerOutput):
     prefix: str = ''
     level: int = -1
     count: int = -1
@@ -335,44 +441,48 @@ class ElementData:
     has_abstract_particle: bool = False
     # additional info if element contains abstract particles and realizations
     has_abstract_sequence: bool = False
-    abstract_sequences = []  # list of tuples (list of particles, min_occurs, max_occurs)
-    # list of particles
-    particles = []
     # additional info if content model is choice
     has_choice: bool = False
-    choices = []
     is_choice: bool = False     # obsolete, will be removed if decoder and encoder is adjusted
     has_sequence: bool = False  # obsolete, will be removed if decoder and encoder is adjusted
-    sequences = []              # obsolete, will be removed if decoder and encoder is adjusted
-    # info regarding namespace elements list
-    is_in_namespace_elements = False
     # additional info if type definition is enum
     has_enum_list: bool = False
-    enum_list = []
 
     def __init__(self, prefix: str):
+        for item in fields(self):
+            setattr(self, item.name, item.default)
         self.prefix = prefix
+        # list of tuples (list of particles, min_occurs, max_occurs)
+        self.abstract_sequences = []
+        # list of particles
+        self.particles = []
+        self.choices = []
+        self.sequences = []  # obsolete, will be removed if decoder and encoder is adjusted
+        # info regarding namespace elements list
+        self.is_in_namespace_elements = False
+        self.enum_list = []
         # list of corresponding next grammar IDs
         self.particles_next_grammar_ids = {}
-        # reset sequences and choices lists
-        self.sequences = []
-        self.choices = []
-        # reset info from abstract particles and realizations
-        self.has_abstract_sequence = False
-        self.abstract_sequences = []
+        # list of the grammar IDs following the first occurrence of array particles
+        self.particles_array_grammar_ids = {}
 
-    @property
+    def freeze(self):
+        AnalyzerOutput.freeze(self)
+        for particle in self.particles:
+            particle.freeze()
+
+    @precomputed
     def typename(self):
         if self.type_short == 'AnonType':
             return self.name_short
 
         return self.type_short
 
-    @property
+    @precomputed
     def prefixed_name(self):
         return self.prefix + self.name_short
 
-    @property
+    @precomputed
     def prefixed_type(self):
         return self.prefix + self.typename
 
@@ -3,7 +3,7 @@
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 
 from dataclasses import dataclass
-from cbexigen.elementData import Particle
+from cbexigen.elementData import Particle, slotted
 
 
 class GrammarFlag:
@@ -13,6 +13,7 @@ class GrammarFlag:
     ERROR = 'ERROR Element'
 
 
+@slotted()
 @dataclass
 class ElementGrammarDetail:
     flag: str = None
@@ -25,6 +26,8 @@ class ElementGrammarDetail:
     is_in_array_last: bool = False
     is_in_array_not_last: bool = False
     is_extra_grammar: bool = False
+    # number of occurrences after which a LOOP is left, None if the loop is not bounded
+    loop_max_occurs: int = None
 
     @property
     def is_optional(self):
@@ -67,13 +70,16 @@ class ElementGrammarDetail:
         return self.particle.name if self.particle else 'END' if self.flag == GrammarFlag.END else 'None'
 
 
+@slotted('details')
 @dataclass
 class ElementGrammar:
     grammar_id: int = -1
-    # details: list[ElementGrammarDetail] = field(default_factory=list[ElementGrammarDetail])
-    details = []
     element_typename: str = ''
 
+    def __post_init__(self):
+        # no field, so the details are neither compared nor part of the representation
+        self.details = []
+
     # TODO: refactor bits_to_read and bits_to_write to just one function with suitable name
 
     @property
@@ -127,3 +133,14 @@ class ElementGrammar:
         comment += ', '.join(detail_list)
 
         return comment
+
+
+@slotted()
+@dataclass
+class GrammarTableEvent:
+    next_grammar: int = -1
+    event_code: int = 0
+    flags: str = '0'
+    comment: str = ''
+    type_content: str = ''
+    condition: str = ''
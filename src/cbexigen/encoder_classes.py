@@ -6,7 +6,7 @@ from typing import List
 from cbexigen.base_coder_classes import ExiBaseCoderHeader, ExiBaseCoderCode
 from cbexigen import tools_generator, tools
 from cbexigen.elementData import ElementData, Particle, ContentType
-from cbexigen.elementGrammar import GrammarFlag, ElementGrammar, ElementGrammarDetail
+from cbexigen.elementGrammar import GrammarFlag, ElementGrammar, ElementGrammarDetail, GrammarTableEvent
 from cbexigen.tools_config import CONFIG_PARAMS, get_fragment_parameter_for_schema
 from cbexigen.tools_logging import log_write_error
 
@@ -16,8 +16,8 @@ from cbexigen.tools_logging import log_write_error
 
 
 class ExiEncoderHeader(ExiBaseCoderHeader):
-    def __init__(self, parameters, enable_logging=True):
-        super(ExiEncoderHeader, self).__init__(parameters=parameters, enable_logging=enable_logging)
+    def __init__(self, parameters, enable_logging=True, context=None):
+        super(ExiEncoderHeader, self).__init__(parameters=parameters, enable_logging=enable_logging, context=context)
 
         self.__schema_prefix = self.parameters['prefix']
         self.__is_iso20 = self.__schema_prefix.startswith('iso20_')
@@ -91,8 +91,9 @@ class ExiEncoderHeader(ExiBaseCoderHeader):
 
 
 class ExiEncoderCode(ExiBaseCoderCode):
-    def __init__(self, parameters, analyzer_data, enable_logging=True):
-        super(ExiEncoderCode, self).__init__(parameters, analyzer_data, enable_logging)
+    def __init__(self, parameters, analyzer_data, enable_logging=True, context=None):
+        super(ExiEncoderCode, self).__init__(parameters, analyzer_data, enable_logging, context)
+        self.coder_direction = 'encode'
 
         self.__schema_prefix = self.parameters['prefix']
         self.__is_iso20 = self.__schema_prefix.startswith('iso20_')
@@ -106,10 +107,23 @@ class ExiEncoderCode(ExiBaseCoderCode):
         self.__include_content = ''
         self.__code_content = ''
         self.__function_content = ''
+        # the table driven encoder keeps the array indexes in a state structure
+        self.__array_index_prefix = ''
+        # array lengths encoded by the current function and their array size defines
+        self.__array_bounds = {}
+        # the characters event of a simple type is written together with the event code
+        self.__characters_event_written = False
 
     # ---------------------------------------------------------------------------
     # generator helper functions
     # ---------------------------------------------------------------------------
+    def __get_array_index_parameter(self, particle: Particle):
+        return self.__array_index_prefix + particle.name + '_currentIndex'
+
+    def __add_array_bound(self, length_parameter, particle: Particle):
+        # the array length is checked against the array size define at the start of the function
+        self.__array_bounds[length_parameter] = particle.prefixed_define_for_array
+
     def get_function_declaration(self, element_name, is_forward_declaration):
         # FIXME convert this to a Jinja template, must correspond exactly to BaseEncodeFunction.jinja
         content = 'static '
@@ -135,6 +149,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
                               value_parameter=value_parameter,
                               size_parameter=size_parameter,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return self.trim_lf(content)
@@ -155,7 +170,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
 
     def __get_content_encode_base64_binary(self, element_typename, detail: ElementGrammarDetail, level):
         size_parameter = f'{detail.particle.prefixed_define_for_base_type}'
-        type_array_index = detail.particle.name + '_currentIndex'
+        type_array_index = self.__get_array_index_parameter(detail.particle)
 
         if detail.particle.parent_has_choice_sequence:
             length_parameter = f'{element_typename}->choice_{detail.particle.parent_choice_sequence_number}.' \
@@ -184,6 +199,10 @@ class ExiEncoderCode(ExiBaseCoderCode):
                               type_array=detail.particle.is_array,
                               type_array_index=type_array_index,
                               next_grammar=detail.next_grammar,
+                              next_grammar_breakout=detail.next_grammar_out,
+                              type_loop_breakout=self.is_loop_breakout(detail),
+                              type_array_len_schema=detail.loop_max_occurs,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return self.trim_lf(content)
@@ -198,6 +217,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
                               bits_to_encode=bits_to_encode,
                               min_value=min_value,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -208,6 +228,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
         temp = self.generator.get_template('EncodeTypeBoolean.jinja')
         content = temp.render(value_parameter=value_parameter,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -224,6 +245,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
         content = temp.render(value_parameter=value_parameter,
                               value_offset=value_offset,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -238,18 +260,23 @@ class ExiEncoderCode(ExiBaseCoderCode):
 
         content = temp.render(value_parameter=value_parameter,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
 
     def __get_content_encode_unsigned_short_array(self, element_typename, detail: ElementGrammarDetail, level):
         value_parameter = f'{element_typename}->{detail.particle.name}.{detail.particle.value_parameter_name}'
-        index_parameter = detail.particle.name + '_currentIndex'
+        index_parameter = self.__get_array_index_parameter(detail.particle)
 
         temp = self.generator.get_template('EncodeTypeUnsignedShortArray.jinja')
         content = temp.render(value_parameter=value_parameter,
                               index_parameter=index_parameter,
                               next_grammar=detail.next_grammar,
+                              next_grammar_breakout=detail.next_grammar_out,
+                              type_loop_breakout=self.is_loop_breakout(detail),
+                              type_array_len_schema=detail.loop_max_occurs,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -264,6 +291,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
 
         content = temp.render(value_parameter=value_parameter,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -278,6 +306,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
 
         content = temp.render(value_parameter=value_parameter,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -288,6 +317,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
         temp = self.generator.get_template('EncodeTypeSigned.jinja')
         content = temp.render(value_parameter=value_parameter,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
         return content
 
@@ -296,7 +326,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
         value_parameter = f'{element_typename}->{detail.particle.name}.{detail.particle.value_parameter_name}'
         size_parameter = f'{detail.particle.prefixed_define_for_base_type}'
 
-        type_array_index = detail.particle.name + '_currentIndex'
+        type_array_index = self.__get_array_index_parameter(detail.particle)
         type_simple = detail.particle.is_attribute or detail.particle.is_simple_content
         if detail.particle.is_array:
             length_parameter = (f'{element_typename}->{detail.particle.name}'
@@ -312,6 +342,10 @@ class ExiEncoderCode(ExiBaseCoderCode):
                               type_array=detail.particle.is_array,
                               type_array_index=type_array_index,
                               next_grammar=detail.next_grammar,
+                              next_grammar_breakout=detail.next_grammar_out,
+                              type_loop_breakout=self.is_loop_breakout(detail),
+                              type_array_len_schema=detail.loop_max_occurs,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return self.trim_lf(content)
@@ -319,13 +353,16 @@ class ExiEncoderCode(ExiBaseCoderCode):
     def __get_content_encode_element_array(self, element_typename, detail: ElementGrammarDetail, level):
         type_parameter = self.config['encode_function_prefix'] + detail.particle.prefixed_type
         value_parameter = f'{element_typename}->{detail.particle.name}.{detail.particle.value_parameter_name}'
-        index_parameter = detail.particle.name + '_currentIndex'
+        index_parameter = self.__get_array_index_parameter(detail.particle)
 
         temp = self.generator.get_template('EncodeTypeElementArray.jinja')
         content = temp.render(type_parameter=type_parameter,
                               value_parameter=value_parameter,
                               index_parameter=index_parameter,
                               next_grammar=detail.next_grammar,
+                              next_grammar_breakout=detail.next_grammar_out,
+                              type_loop_breakout=self.is_loop_breakout(detail),
+                              type_array_len_schema=detail.loop_max_occurs,
                               indent=self.indent, level=level)
 
         return content
@@ -355,7 +392,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
         return content
 
     def __get_content_encode_enum_array(self, element_typename, detail: ElementGrammarDetail, level):
-        index_parameter = detail.particle.name + '_currentIndex'
+        index_parameter = self.__get_array_index_parameter(detail.particle)
         value_parameter = f'{element_typename}->{detail.particle.name}.{detail.particle.value_parameter_name}'
         bits_to_encode = detail.particle.bit_count_for_coding
 
@@ -364,6 +401,10 @@ class ExiEncoderCode(ExiBaseCoderCode):
                               bits_to_encode=bits_to_encode,
                               index_parameter=index_parameter,
                               next_grammar=detail.next_grammar,
+                              next_grammar_breakout=detail.next_grammar_out,
+                              type_loop_breakout=self.is_loop_breakout(detail),
+                              type_array_len_schema=detail.loop_max_occurs,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -377,6 +418,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
                               bits_to_encode=bits_to_encode,
                               type_attribute=detail.particle.is_attribute,
                               next_grammar=detail.next_grammar,
+                              characters_event_written=self.__characters_event_written,
                               indent=self.indent, level=level)
 
         return content
@@ -468,6 +510,22 @@ class ExiEncoderCode(ExiBaseCoderCode):
 
         return type_content
 
+    def __get_event_code_and_type_content(self, grammar: ElementGrammar, detail: ElementGrammarDetail, level):
+        bits_to_write = grammar.bits_to_write
+        value_to_write = detail.event_index
+
+        # the characters event (CH) of a simple type is the only event with code 0 (1 bit),
+        # so it is appended to the event code of the element and written with a single call
+        if self.config['merge_event_codes'] == 1 and self.is_characters_event_mergeable(detail):
+            bits_to_write += 1
+            value_to_write = detail.event_index << 1
+            self.__characters_event_written = True
+
+        type_content = self.__get_type_content(grammar, detail, level)
+        self.__characters_event_written = False
+
+        return bits_to_write, value_to_write, type_content
+
     def __get_event_content_for_end_element(self, detail: ElementGrammarDetail, bits_to_write, is_single, level):
         content = ''
 
@@ -487,18 +545,21 @@ class ExiEncoderCode(ExiBaseCoderCode):
         content = ''
         event_comment = f'// Event: {detail.flag} ({detail.particle.typename}); next={detail.next_grammar}'
         is_single_detail = True if grammar.details_count == 1 else False
-        index_parameter = detail.particle.name + '_currentIndex'
+        index_parameter = self.__get_array_index_parameter(detail.particle)
         length_parameter = f'{grammar.element_typename}->{detail.particle.name}.arrayLen'
+        self.__add_array_bound(length_parameter, detail.particle)
         current_level = level + 2 if option >= 0 else level + 3
+        bits_to_write, value_to_write, type_content = \
+            self.__get_event_code_and_type_content(grammar, detail, current_level)
 
         temp = self.generator.get_template('EncodeEventArrayElement.jinja')
         content += temp.render(option=option,
                                index_parameter=index_parameter,
                                length_parameter=length_parameter,
-                               bits_to_write=grammar.bits_to_write,
-                               value_to_write=detail.event_index,
+                               bits_to_write=bits_to_write,
+                               value_to_write=value_to_write,
                                event_comment=event_comment,
-                               type_content=self.__get_type_content(grammar, detail, current_level),
+                               type_content=type_content,
                                is_single_detail=is_single_detail,
                                add_debug_code=self.get_status_for_add_debug_code(detail.particle.prefixed_name),
                                type_parameter=CONFIG_PARAMS['encode_function_prefix'] + detail.particle.prefixed_name,
@@ -512,22 +573,25 @@ class ExiEncoderCode(ExiBaseCoderCode):
         event_comment = f'// Event: {detail.flag} ({detail.particle.name}, {detail.particle.typename})' \
                         f'; next={detail.next_grammar} (optional array)'
         type_parameter = CONFIG_PARAMS['encode_function_prefix'] + detail.particle.prefixed_name
-        index_parameter = detail.particle.name + '_currentIndex'
+        index_parameter = self.__get_array_index_parameter(detail.particle)
         length_parameter = (f'{grammar.element_typename}->{detail.particle.name}'
                             f'.{detail.particle.length_parameter_name}')
 
         if detail.particle.is_array:
             length_parameter = (f'{grammar.element_typename}->{detail.particle.name}'
                                 f'.arrayLen')
+            self.__add_array_bound(length_parameter, detail.particle)
+
+        bits_to_write, value_to_write, type_content = self.__get_event_code_and_type_content(grammar, detail, 5)
 
         temp = self.generator.get_template('EncodeEventOptionalArrayElement.jinja')
         content = temp.render(option=option,
                               index_parameter=index_parameter,
                               length_parameter=length_parameter,
-                              bits_to_write=grammar.bits_to_write,
-                              value_to_write=detail.event_index,
+                              bits_to_write=bits_to_write,
+                              value_to_write=value_to_write,
                               event_comment=event_comment,
-                              type_content=self.__get_type_content(grammar, detail, 5),
+                              type_content=type_content,
                               add_debug_code=self.get_status_for_add_debug_code(detail.particle.prefixed_name),
                               type_parameter=type_parameter,
                               indent=self.indent, level=level)
@@ -558,13 +622,16 @@ class ExiEncoderCode(ExiBaseCoderCode):
                 else:
                     parameter = grammar.element_typename + '->' + detail.particle.name
 
+                bits_to_write, value_to_write, type_content = \
+                    self.__get_event_code_and_type_content(grammar, detail, 5)
+
                 temp = self.generator.get_template('EncodeEventOptionalElement.jinja')
                 content += temp.render(option=option,
                                        parameter=parameter,
-                                       bits_to_write=grammar.bits_to_write,
-                                       value_to_write=detail.event_index,
+                                       bits_to_write=bits_to_write,
+                                       value_to_write=value_to_write,
                                        event_comment=event_comment,
-                                       type_content=self.__get_type_content(grammar, detail, 5),
+                                       type_content=type_content,
                                        add_debug_code=self.get_status_for_add_debug_code(detail.particle.prefixed_name),
                                        type_parameter=type_parameter,
                                        indent=self.indent, level=level)
@@ -599,11 +666,13 @@ class ExiEncoderCode(ExiBaseCoderCode):
             else:
                 event_comment = f'// Event: {detail.flag} ({detail.particle.typename}); next={detail.next_grammar}'
             type_parameter = CONFIG_PARAMS['encode_function_prefix'] + detail.particle.prefixed_name
+            bits_to_write, value_to_write, type_content = self.__get_event_code_and_type_content(grammar, detail, 4)
+
             temp = self.generator.get_template('EncodeEventSingleElement.jinja')
-            content += temp.render(bits_to_write=grammar.bits_to_write,
-                                   value_to_write=detail.event_index,
+            content += temp.render(bits_to_write=bits_to_write,
+                                   value_to_write=value_to_write,
                                    event_comment=event_comment,
-                                   type_content=self.__get_type_content(grammar, detail, 4),
+                                   type_content=type_content,
                                    add_debug_code=self.get_status_for_add_debug_code(detail.particle.prefixed_name),
                                    type_parameter=type_parameter,
                                    indent=self.indent, level=level)
@@ -677,8 +746,13 @@ class ExiEncoderCode(ExiBaseCoderCode):
             bits_to_write = tools.get_bits_to_decode(len(names))
             next_grammar = grammar.details[0].next_grammar
 
+            option = 0
             for index, name in enumerate(names):
                 hits = [x for x in element.particles if x.name == name]
+                if self.is_particle_pruned(element, hits[0]):
+                    # not part of the message subset for encoding, the event code is kept
+                    continue
+
                 event_comment = f'// Event: {hits[0].name}'
                 parameter = f'{element.typename}->{name}'
                 type_content = self.__get_content_encode_namespace_element(element.typename, hits[0],
@@ -686,7 +760,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
 
                 temp = self.generator.get_template('EncodeEventOptionalElement.jinja')
                 content += temp.render(parameter=parameter,
-                                       option=index,
+                                       option=option,
                                        bits_to_write=bits_to_write,
                                        value_to_write=index,
                                        event_comment=event_comment,
@@ -694,6 +768,13 @@ class ExiEncoderCode(ExiBaseCoderCode):
                                        add_debug_code=self.get_status_for_add_debug_code(element.prefixed_type),
                                        type_parameter=CONFIG_PARAMS['encode_function_prefix'] + element.prefixed_type,
                                        indent=self.indent, level=level)
+                option += 1
+
+            if option == 0:
+                temp = self.generator.get_template('EncodeEventOptionalElementNone.jinja')
+                content += temp.render(option=option,
+                                       event_comment='// no message is part of the message subset for encoding',
+                                       indent=self.indent, level=level)
 
             content += '\n'
             temp = self.generator.get_template('EncodeEventErrorUnknownId.jinja')
@@ -701,15 +782,34 @@ class ExiEncoderCode(ExiBaseCoderCode):
 
         return self.left_trim_lf(content)
 
+    def __get_fused_grammar_content(self, chain: List[ElementGrammar], level):
+        fused_content = ''
+
+        for grammar in chain:
+            temp = self.generator.get_template('BaseEncodeFusedGrammar.jinja')
+            fused_content += temp.render(grammar_id_comment=grammar.grammar_comment,
+                                         event_content=self.__get_event_content(grammar, level),
+                                         indent=self.indent, level=level)
+
+            fused_content += '\n'
+
+        return self.trim_lf(fused_content)
+
     def __get_grammar_content(self, grammars: List[ElementGrammar], level, element: ElementData = None):
         grammar_content = ''
 
+        # chains of single event grammars are encoded within the case of their first grammar,
+        # the namespace elements have their own event content
+        chains, fused_ids = {}, []
+        if element is None:
+            chains, fused_ids = self.get_grammar_chains(grammars)
+
         for grammar in grammars:
-            if grammar.details[0].flag == GrammarFlag.ERROR:
+            if grammar.details[0].flag == GrammarFlag.ERROR or grammar.grammar_id in fused_ids:
                 continue
 
             # first reorder details, move first END Element to end of list
-            self.move_end_element_to_end_of_list(grammar)
+            grammar = self.get_grammar_with_end_element_last(grammar)
 
             if element is None or grammar.details[0].flag == GrammarFlag.END:
                 grammar_id_comment = grammar.grammar_comment
@@ -720,22 +820,170 @@ class ExiEncoderCode(ExiBaseCoderCode):
                 grammar_id_comment += f'{grammar.details[0].flag} ({grammar.details[0].particle.name})'
                 event_content = self.__get_event_content_namespace_element(element, grammar, level + 1)
 
+            fused_content = ''
+            if grammar.grammar_id in chains:
+                fused_content = self.__get_fused_grammar_content(chains[grammar.grammar_id], level + 1)
+
             temp = self.generator.get_template('BaseEncodeCaseGrammarId.jinja')
             grammar_content += temp.render(grammar_id=grammar.grammar_id,
                                            grammar_id_comment=grammar_id_comment,
                                            event_content=event_content,
+                                           fused_content=fused_content,
                                            indent=self.indent, level=level)
 
             grammar_content += '\n'
 
         return self.trim_lf(grammar_content)
 
+    def __get_grammar_table_event(self, grammar: ElementGrammar, detail: ElementGrammarDetail, condition, level):
+        event = GrammarTableEvent(next_grammar=detail.next_grammar, event_code=detail.event_index,
+                                  comment=f'{detail.flag} ({detail.particle_name}); next={detail.next_grammar}')
+
+        if detail.flag == GrammarFlag.END:
+            event.flags = 'EXI_GRAMMAR_EVENT_END'
+        elif detail.particle is None or (detail.is_any and detail.any_is_dummy) or detail.is_extra_grammar:
+            # unsupported or additional particle, no code is generated for it
+            event.flags = 'EXI_GRAMMAR_EVENT_NONE'
+        else:
+            event.flags = 'EXI_GRAMMAR_EVENT_CONDITIONAL' if condition else '0'
+            event.condition = condition
+            event.type_content = self.__get_type_content(grammar, detail, level)
+
+        return event
+
+    def __get_array_condition(self, grammar: ElementGrammar, detail: ElementGrammarDetail):
+        length_parameter = f'{grammar.element_typename}->{detail.particle.name}.arrayLen'
+        if not detail.particle.is_array:
+            length_parameter = (f'{grammar.element_typename}->{detail.particle.name}'
+                                f'.{detail.particle.length_parameter_name}')
+        else:
+            self.__add_array_bound(length_parameter, detail.particle)
+
+        return f'{self.__get_array_index_parameter(detail.particle)} < {length_parameter}'
+
+    def __get_optional_condition(self, grammar: ElementGrammar, detail: ElementGrammarDetail):
+        if detail.particle.parent_has_choice_sequence:
+            parameter = f'{grammar.element_typename}->choice_{detail.particle.parent_choice_sequence_number}'
+        else:
+            parameter = grammar.element_typename + '->' + detail.particle.name
+
+        return f'{parameter}_isUsed == 1u'
+
+    def __get_grammar_table_events(self, grammar: ElementGrammar, level):
+        # the events are listed in the order in which the state machine tests them, see __get_event_content
+        events = []
+        first: ElementGrammarDetail = grammar.details[0]
+
+        if first.flag == GrammarFlag.ERROR:
+            return events
+
+        if grammar.details_count == 1:
+            condition = self.__get_array_condition(grammar, first) if first.is_mandatory_array else ''
+            events.append(self.__get_grammar_table_event(grammar, first, condition, level))
+            return events
+
+        option = 0
+        end_detail = None
+        detail: ElementGrammarDetail
+        for index, detail in enumerate(grammar.details):
+            if detail.flag == GrammarFlag.END:
+                end_detail = detail
+                continue
+
+            if index == grammar.details_count - 1 and option != 0 and not detail.is_any:
+                # the final detail is encoded without condition
+                option = -1
+
+            if detail.particle.was_array or not (detail.is_mandatory_array or detail.is_optional_array):
+                condition = self.__get_optional_condition(grammar, detail) if option != -1 else ''
+                events.append(self.__get_grammar_table_event(grammar, detail, condition, level))
+            else:
+                array_detail = first if detail.is_mandatory_array and option >= 0 else detail
+                events.append(self.__get_grammar_table_event(grammar, array_detail,
+                                                             self.__get_array_condition(grammar, array_detail),
+                                                             level))
+
+            if not (detail.is_any and detail.any_is_dummy):
+                option += 1
+
+        if end_detail is not None:
+            events.append(self.__get_grammar_table_event(grammar, end_detail, '', level))
+
+        return events
+
+    def __get_function_content_grammar_table(self, element: ElementData, grammars: List[ElementGrammar]):
+        event_content = ''
+        condition_content = ''
+        self.__array_bounds = {}
+
+        names = []
+        has_array = self.has_element_array_particle(element)
+        if has_array:
+            names = self.get_element_array_particle_names(element)
+            self.__array_index_prefix = 'state->'
+
+        for grammar in grammars:
+            # the END and ERROR grammars are shared by all types and only added once
+            if self.is_grammar_in_table(grammar.grammar_id):
+                continue
+
+            grammar = self.get_grammar_with_end_element_last(grammar)
+            events = self.__get_grammar_table_events(grammar, 2)
+            first_event = self.append_grammar_to_table(grammar, events)
+
+            for index, event in enumerate(events):
+                event_comment = f'// Event: {event.comment}'
+
+                if event.condition != '':
+                    temp = self.generator.get_template('EncodeGrammarTableCaseCondition.jinja')
+                    condition_content += temp.render(event_id=first_event + index,
+                                                     event_comment=event_comment,
+                                                     condition=event.condition,
+                                                     indent=self.indent, level=1)
+                    condition_content += '\n'
+
+                if event.type_content != '':
+                    temp = self.generator.get_template('EncodeGrammarTableCaseEvent.jinja')
+                    event_content += temp.render(event_id=first_event + index,
+                                                 event_comment=event_comment,
+                                                 type_content=event.type_content,
+                                                 add_debug_code=self.get_status_for_add_debug_code(element.prefixed_type),
+                                                 type_parameter=CONFIG_PARAMS['encode_function_prefix'] +
+                                                 element.prefixed_type,
+                                                 indent=self.indent, level=1)
+                    event_content += '\n'
+
+        self.__array_index_prefix = ''
+
+        temp = self.generator.get_template('EncodeGrammarTableFunction.jinja')
+        content = temp.render(element_comment=element.element_comment,
+                              particle_comment=element.particle_comment,
+                              function_name=CONFIG_PARAMS['encode_function_prefix'] + element.prefixed_type,
+                              struct_type=element.prefixed_type, parameter_name=element.typename,
+                              start_grammar_id=self.get_start_grammar_id(grammars),
+                              event_content=self.trim_lf(event_content),
+                              condition_content=self.trim_lf(condition_content),
+                              has_array=has_array, names=names,
+                              array_bounds=self.__array_bounds,
+                              table_name=self.__schema_prefix + 'grammar_table',
+                              add_debug_code=self.get_status_for_add_debug_code(element.prefixed_type),
+                              indent=self.indent, level=1)
+        content += '\n\n'
+
+        return content
+
+    def __uses_grammar_table(self, element: ElementData, grammars: List[ElementGrammar]):
+        # namespace elements have their own grammar content, they are always generated as state machine
+        return (self.use_grammar_tables and not element.is_in_namespace_elements and
+                self.get_start_grammar_id(grammars) >= 0)
+
     def __get_function_content(self, element: ElementData, grammars: List[ElementGrammar]):
         typename = element.typename
         content = ''
 
         start_grammar_id = self.get_start_grammar_id(grammars)
         if start_grammar_id >= 0:
+            self.__array_bounds = {}
             if element.is_in_namespace_elements:
                 grammar_content = self.__get_grammar_content(grammars, 2, element)
             else:
@@ -756,6 +1004,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
                                    start_grammar_id=start_grammar_id,
                                    grammar_content=grammar_content,
                                    has_array=has_array, names=names,
+                                   array_bounds=self.__array_bounds,
                                    add_debug_code=self.get_status_for_add_debug_code(element.prefixed_type),
                                    indent=self.indent, level=1)
             content += '\n\n'
@@ -783,6 +1032,7 @@ class ExiEncoderCode(ExiBaseCoderCode):
         elif len(self.analyzer_data.root_elements) > 1:
             encode_fn = []
             for elem in self.analyzer_data.root_elements:
+                pruned = self.analyzer_data.is_message_pruned(elem.name_short, self.coder_direction)
                 if self.__is_iso20:
                     # TODO: The following if filters the simple types DigestValue, MgmtData and KeyName.
                     #       Simple types have to be encoded directly and not with an encoding function.
@@ -791,16 +1041,17 @@ class ExiEncoderCode(ExiBaseCoderCode):
                     prefix_name_short = f'{elem.prefix}{elem.name_short}'
                     if elem.type_definition == 'complex':
                         encode_fn.append([CONFIG_PARAMS['encode_function_prefix'] + elem.prefixed_type,
-                                          parameter_name + '->' + elem.name_short])
+                                          parameter_name + '->' + elem.name_short, pruned])
                     else:
-                        encode_fn.append([f'{CONFIG_PARAMS["encode_function_prefix"]}{prefix_name_short}', ''])
+                        encode_fn.append([f'{CONFIG_PARAMS["encode_function_prefix"]}{prefix_name_short}', '',
+                                          pruned])
                 else:
                     if elem.typename in self.analyzer_data.schema_builtin_types:
                         encode_fn.append([f'{CONFIG_PARAMS["encode_function_prefix"]}{elem.prefix}{elem.name_short}',
-                                          f'{parameter_name}->{elem.prefix}{elem.name_short}'])
+                                          f'{parameter_name}->{elem.prefix}{elem.name_short}', pruned])
                     else:
                         encode_fn.append([CONFIG_PARAMS['encode_function_prefix'] + elem.prefixed_type,
-                                          parameter_name + '->' + elem.typename])
+                                          parameter_name + '->' + elem.typename, pruned])
 
             encode_fn.sort()
 
@@ -901,7 +1152,8 @@ class ExiEncoderCode(ExiBaseCoderCode):
         encode_fn = []
         for fragment in self.analyzer_data.known_fragments.values():
             if 'xmldsig' in fragment.namespace.casefold():
-                if fragment.type in self.analyzer_data.known_elements.values():
+                if fragment.type in self.analyzer_data.known_elements.values() and \
+                        not self.analyzer_data.is_element_pruned(fragment.type, self.coder_direction):
                     function = f'{CONFIG_PARAMS["encode_function_prefix"]}{self.__schema_prefix}{fragment.type}'
                     parameter = f'{parameter_name}->{fragment.name}'
                     encode_fn.append([fragment.name, fragment.namespace, function, parameter])
@@ -943,70 +1195,58 @@ class ExiEncoderCode(ExiBaseCoderCode):
                             f'{self.__class__.__name__}.{self.generate_file.__name__}')
             return
 
-        self.__include_content = tools_generator.get_includes_content(self.c_params)
+        self.__include_content = tools_generator.get_includes_content(self.get_c_include_parameters())
         self.__code_content = ''
         self.__function_content = ''
 
         analyzed_elements = {}
         static_declarations = []
+        state_machine_lines = 0
+        grammar_table_lines = 0
 
         self.reset_grammar_ids()
+        self.reset_grammar_table()
         self.init_lists_for_generating_elements()
         self.init_list_with_known_type_names()
 
-        curr_idx = 0
-        while_count = 0
-        while len(self.elements_to_generate) > 0:
-            # loop should not run forever
-            while_count += 1
-            if while_count > 10000:
-                log_write_error('Module encoder: Generator loop aborted! Loop counter exceeded.')
-                break
-
-            element: ElementData = self.elements_to_generate[curr_idx]
+        # the types are generated after the types they use
+        elements = self.analyzer_data.get_generate_order(self.elements_to_generate, self.elements_generated,
+                                                         'encoder', self.coder_direction)
+        for element, (grammars, log_lines) in zip(elements, self.get_element_grammars_of_types(elements)):
             elem_typename = element.typename
-            skip_element = self.test_on_skip(element)
-
-            if skip_element:
-                curr_idx += 1
-                if curr_idx > len(self.elements_to_generate):
-                    log_write_error('Module encoder: Generator loop aborted! Index larger than existing elements.')
-                    break
-            else:
-                self.log(f'Grammar for {elem_typename}')
-                self.log(element.element_comment)
-                self.log(element.particle_comment)
-
-                # get forward declarations
-                static_declarations.append(self.get_function_declaration(elem_typename, True))
+            for line in log_lines:
+                self.log(line)
 
-                # determine grammar ids for calculating bits to read from stream
-                self.generate_element_grammars(element)
+            # get forward declarations
+            static_declarations.append(self.get_function_declaration(elem_typename, True))
 
-                if self.grammar_end_element == 0:
-                    self.grammar_end_element = self.grammar_id
-                    self.grammar_unknown = self.grammar_id + 1
-                    self.grammar_id += 2
-
-                self.append_end_and_unknown_grammars(element.typename)
-
-                self.log('')
-                self.generate_event_info(self.element_grammars, element)
-                self.log('')
-                analyzed_elements[elem_typename] = self.element_grammars
+            self.element_grammars = grammars
+            analyzed_elements[elem_typename] = self.element_grammars
 
+            if self.__uses_grammar_table(element, self.element_grammars):
+                # the state machine is only rendered for the size comparison of the report
+                state_machine_lines += self.__get_function_content(element, self.element_grammars).count('\n')
+                function_content = self.__get_function_content_grammar_table(element, self.element_grammars)
+                grammar_table_lines += function_content.count('\n')
+                self.__function_content += function_content
+            else:
                 self.__function_content += self.__get_function_content(element, self.element_grammars)
 
-                # add element to list of generated ane remove from list to generate and reset element index
-                self.elements_generated.append(elem_typename)
-                self.elements_to_generate.remove(element)
-                curr_idx = 0
+            # add element to list of generated
+            self.elements_generated.append(elem_typename)
 
         # from here on all forward declarations are known
         for line in static_declarations:
             self.__code_content += line + '\n'
 
         self.__code_content += '\n'
+        if self.use_grammar_tables:
+            grammar_table_content = self.get_grammar_table_content(self.__schema_prefix + 'grammar_table')
+            if grammar_table_content != '':
+                self.__code_content += grammar_table_content
+                self.__code_content += '\n\n'
+                self.report_grammar_table(state_machine_lines, grammar_table_lines)
+
         self.__code_content += self.__function_content
 
         self.__code_content += '\n'
@@ -3,8 +3,10 @@
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 
 """ Tools for the Exi Codegenerator """
+import os
 from pathlib import Path
-from cbexigen.tools_config import CONFIG_ARGS, CONFIG_PARAMS
+from cbexigen.tools_config import CONFIG_ARGS, CONFIG_PARAMS, get_context
+from cbexigen.tools_profile import profile_phase
 from xmlschema import XMLSchema11, XsdElement
 from xmlschema.validators import XsdAnyElement, XsdAtomicBuiltin, Xsd11AtomicRestriction, Xsd11Group
 from pprint import pprint
@@ -41,16 +43,69 @@ TYPE_TRANSLATION = {
 
 
 ''' code tools '''
+MANIFEST_FILE_NAME = 'manifest.txt'
 
 
 def save_code_to_file(filename, code, folder=''):
+    """
+        Saves the code to the file in the folder of the output directory and adds the file to the manifest.
+        In incremental mode, a file with the same content is not written again. A file is written
+        to a temporary file first and then renamed, so there is never a partly written file.
+        If the generation context keeps the output in memory, the code is only added to its output.
+    """
+    context = get_context()
+    name = Path(folder, filename).as_posix()
+    if context.output is not None:
+        status = 'new'
+        if name in context.output:
+            status = 'unchanged' if context.output[name] == code else 'changed'
+        context.generated_files[name] = status
+        context.output[name] = code
+        return
+
     out_dir = Path(CONFIG_ARGS['output_dir'], folder, filename).resolve()
 
     if not Path(CONFIG_ARGS['output_dir'], folder).exists():
         Path(CONFIG_ARGS['output_dir'], folder).mkdir(parents=True, exist_ok=True)
 
-    with open(out_dir, 'w') as fp:
-        fp.write(code)
+    status = 'new'
+    if out_dir.exists():
+        with open(out_dir, 'r') as fp:
+            status = 'unchanged' if fp.read() == code else 'changed'
+
+    context.generated_files[name] = status
+    if status == 'unchanged' and CONFIG_PARAMS['incremental_output'] == 1:
+        return
+
+    with profile_phase('write', filename):
+        temp_file = out_dir.with_name(f'.{out_dir.name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_file, 'w') as fp:
+                fp.write(code)
+                fp.close()
+            os.replace(temp_file, out_dir)
+        except Exception:
+            # the temporary file is not left in the output directory
+            if temp_file.exists():
+                temp_file.unlink()
+            raise
+
+
+def write_manifest():
+    """
+        Writes the manifest of the generated files with the status of every file in this run
+        (new, changed or unchanged) to the log directory. Without log directory, no manifest is written.
+    """
+    if CONFIG_ARGS['log_dir'] == '':
+        return
+
+    generated_files = get_context().generated_files
+    content = '# files generated by the last run of the code generator\n'
+    for name in sorted(generated_files.keys()):
+        content += f'{generated_files[name]:<10} {name}\n'
+
+    with open(Path(CONFIG_ARGS['log_dir'], MANIFEST_FILE_NAME), 'w') as fp:
+        fp.write(content)
         fp.close()
 
 
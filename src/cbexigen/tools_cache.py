@@ -0,0 +1,193 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2022 - 2023 chargebyte GmbH
+# Copyright (c) 2022 - 2023 Contributors to EVerest
+
+""" Tools for the Exi Codegenerator analyzer data cache """
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import xmlschema
+
+from cbexigen.tools_config import CONFIG_ARGS, CONFIG_PARAMS, get_config_module
+from cbexigen.tools_logging import log_write, log_write_error
+from cbexigen.typeDefinitions import AnalyzerData
+
+# the members of the analyzer data which are the result of the analysis
+CACHED_ANALYZER_DATA = (
+    'root_elements', 'generate_elements', 'generate_elements_types',
+    'known_elements', 'known_particles', 'known_enums', 'known_prototypes', 'known_fragments',
+    'max_occurs_changed', 'namespace_elements', 'schema_builtin_types',
+    'selected_messages', 'pruned_messages', 'pruned_elements',
+    'schema_enumerations', 'schema_element_names', 'type_dependencies',
+)
+
+# config parameters of the schema which are used by the analysis
+CACHED_SCHEMA_PARAMETERS = (
+    'array_optimizations', 'fragments', 'ambiguous_element_names', 'messages', 'max_lengths',
+)
+
+# the analyzer data kept in memory in watch mode, as content of the cache file by its name,
+# so the schemas which did not change are not analyzed again while the generator is running
+__MEMORY_CACHE = {}
+
+__GENERATOR_VERSION = None
+
+
+def __get_generator_version():
+    """
+        Returns the version of the generator as hash of its source files and the xmlschema version.
+    """
+    global __GENERATOR_VERSION
+
+    if __GENERATOR_VERSION is None:
+        sha = hashlib.sha256(xmlschema.__version__.encode())
+        for file in sorted(Path(__file__).parent.glob('*.py')):
+            sha.update(file.name.encode())
+            sha.update(file.read_bytes())
+        __GENERATOR_VERSION = sha.hexdigest()
+
+    return __GENERATOR_VERSION
+
+
+def __get_file_hash(file: Path):
+    try:
+        return hashlib.sha256(file.read_bytes()).hexdigest()
+    except OSError:
+        return ''
+
+
+def __get_cache_name(schema_file: Path, schema_prefix):
+    """
+        Returns the name of the cache file of the schema, or None if the cache is disabled.
+        The name of the file is the hash of the schema file name, the config and the generator version.
+    """
+    # in watch mode the analyzer data is kept in memory, also without cache directory
+    if CONFIG_ARGS['cache_dir'] == '' and CONFIG_ARGS['watch'] != 1:
+        return None
+
+    # the analysis trees are written while analyzing the schema
+    if CONFIG_PARAMS['generate_analysis_tree'] == 1 or CONFIG_PARAMS['generate_analysis_tree_20'] == 1:
+        return None
+
+    config_module = get_config_module()
+    schema_parameters = {}
+    for name in CACHED_SCHEMA_PARAMETERS:
+        schema_parameters[name] = getattr(config_module, schema_prefix + name, None)
+
+    sha = hashlib.sha256(__get_generator_version().encode())
+    sha.update(str(schema_file).encode())
+    sha.update(schema_prefix.encode())
+    sha.update(repr(CONFIG_PARAMS).encode())
+    sha.update(repr(schema_parameters).encode())
+
+    return f'{schema_prefix}analyzer_data_{sha.hexdigest()}.pickle'
+
+
+def __update_analyzer_data(analyzer_data: AnalyzerData, values):
+    # the members are shared with the analyzer and the coders, so they are updated and not replaced
+    for name, value in values.items():
+        member = getattr(analyzer_data, name)
+        member.clear()
+        if isinstance(member, dict):
+            member.update(value)
+        else:
+            member.extend(value)
+
+
+def load_analyzer_data(schema_file: Path, schema_prefix, analyzer_data: AnalyzerData):
+    """
+        Loads the analyzer data of the schema from the cache into the given analyzer data.
+        In watch mode, the analyzer data kept in memory is taken first.
+        Returns False if the cache is disabled, has no data of the schema or one of the schema files changed.
+    """
+    cache_name = __get_cache_name(schema_file, schema_prefix)
+    if cache_name is None:
+        return False
+
+    data = __MEMORY_CACHE.get(cache_name, None) if CONFIG_ARGS['watch'] == 1 else None
+    source = 'memory'
+    if data is None:
+        cache_file = Path(CONFIG_ARGS['cache_dir'], cache_name)
+        if CONFIG_ARGS['cache_dir'] == '' or not cache_file.exists():
+            return False
+
+        try:
+            data = cache_file.read_bytes()
+        except OSError as err:
+            log_write_error(f'Analyzer data cache {cache_file} could not be read: {err}')
+            return False
+        source = f'cache {cache_name}'
+
+    try:
+        content = pickle.loads(data)
+    except (EOFError, AttributeError, ImportError, pickle.PickleError) as err:
+        log_write_error(f'Analyzer data cache {cache_name} could not be read: {err}')
+        return False
+
+    for name, file_hash in content['schema_files'].items():
+        if __get_file_hash(Path(name)) != file_hash:
+            log_write(f'Analyzer data cache {cache_name} is outdated, {name} changed')
+            return False
+
+    __update_analyzer_data(analyzer_data, content['analyzer_data'])
+    if CONFIG_ARGS['watch'] == 1:
+        __MEMORY_CACHE[cache_name] = data
+
+    log_write(f'Analyzer data of {schema_file.name} loaded from {source}')
+    return True
+
+
+def save_analyzer_data(schema_file: Path, schema_prefix, analyzer_data: AnalyzerData, schema_files):
+    """
+        Saves the analyzer data of the schema to the cache, together with the hashes of all schema files.
+        In watch mode, the analyzer data is kept in memory as well.
+        Has to be called after the analysis and before the code generation changes the analyzer data.
+    """
+    cache_name = __get_cache_name(schema_file, schema_prefix)
+    if cache_name is None:
+        return
+
+    content = {
+        'schema_files': {str(file): __get_file_hash(file) for file in schema_files},
+        'analyzer_data': {name: getattr(analyzer_data, name) for name in CACHED_ANALYZER_DATA},
+    }
+
+    try:
+        data = pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL)
+    except pickle.PickleError as err:
+        log_write_error(f'Analyzer data cache {cache_name} could not be written: {err}')
+        return
+
+    if CONFIG_ARGS['watch'] == 1:
+        __MEMORY_CACHE[cache_name] = data
+    if CONFIG_ARGS['cache_dir'] == '':
+        return
+
+    # write to a temporary file first, so parallel generators never read a partly written file
+    cache_file = Path(CONFIG_ARGS['cache_dir'], cache_name)
+    temp_file = cache_file.with_name(f'{cache_file.name}.{os.getpid()}.tmp')
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_file, 'wb') as file:
+            file.write(data)
+        os.replace(temp_file, cache_file)
+    except OSError as err:
+        log_write_error(f'Analyzer data cache {cache_file} could not be written: {err}')
+        if temp_file.exists():
+            temp_file.unlink()
+
+
+def get_analyzer_data_snapshot(analyzer_data: AnalyzerData):
+    """
+        Returns a snapshot of the analyzer data, taken after the analysis of the schema structure.
+        Every codec variant restores it and applies its own selections of the config to the copy.
+    """
+    values = {name: getattr(analyzer_data, name) for name in CACHED_ANALYZER_DATA}
+
+    return pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def restore_analyzer_data_snapshot(snapshot, analyzer_data: AnalyzerData):
+    __update_analyzer_data(analyzer_data, pickle.loads(snapshot))
@@ -3,25 +3,53 @@
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 
 """ Tools for the Exi Codegenerator config """
-import importlib
+import contextlib
+import contextvars
+import copy
+import importlib.util
+import types
 
+from collections.abc import MutableMapping
 from typing import Union, Dict
 from pathlib import Path
 
 import urllib.request
 
-CONFIG_ARGS: Dict[str, Union[str, Path]] = {
+# values of the config which are used by the analysis of the schema structure, or which are the same for
+# the whole run, so a codec variant can't change them. The analysis is shared by all codec variants.
+VARIANT_FIXED_VALUES = ('c_files_to_generate', 'schema_base_dir', 'log_dir', 'log_file_name', 'cache_dir',
+                        'generate_fragments', 'generate_analysis_tree', 'generate_analysis_tree_20')
+VARIANT_FIXED_SCHEMA_VALUES = ('ambiguous_element_names',)
+
+# default arguments and parameters of a generation context
+DEFAULT_CONFIG_ARGS: Dict[str, Union[str, Path, int]] = {
     'program_dir': '',
     'config_file': '',
     'log_dir': '',
     'template_dir': '',
     'output_dir': '',
-    'schema_base_dir': ''
+    'schema_base_dir': '',
+    'cache_dir': '',
+    'jobs': 1,
+    # verbosity of the console output and the log, see tools_logging
+    'verbosity': 2,
+    # 1 = the phases of the generation are profiled, see tools_profile
+    'profile': 0,
+    # 1 = the generator keeps running and generates the files again on changes, see tools_watch
+    'watch': 0
 }
 
-CONFIG_PARAMS: Dict[str, Union[str, int]] = {
+DEFAULT_CONFIG_PARAMS: Dict[str, Union[str, int]] = {
     # add debug code while generating code
     'add_debug_code': 0,
+    # output files, 1 = files with unchanged content are not written again
+    'incremental_output': 0,
+    # bitstream access, 1 = word-at-a-time, 0 = bit-by-bit
+    'bitstream_word_access': 0,
+    # state machine, 1 = chains of single event grammars as straight-line code
+    'fuse_grammar_chains': 0,
+    # state machine, 1 = constant event codes are written and read with a single call
+    'merge_event_codes': 0,
     # generate analysis tree while generating code
     'generate_analysis_tree': 0,
     'generate_analysis_tree_20': 0,
@@ -31,6 +59,10 @@ CONFIG_PARAMS: Dict[str, Union[str, int]] = {
     # name addendum definitions
     'array_define_addendum': '_ARRAY_SIZE',
     'char_define_addendum': '_CHARACTER_SIZE',
+    # field length definitions, lengths without maxLength facet and upper limit of all lengths (0 = no limit)
+    'string_max_length': 64,
+    'byte_array_max_length': 350,
+    'max_length_clamp': 0,
     # name prefix definitions
     'init_function_prefix': 'init_',
     'encode_function_prefix': 'encode_',
@@ -50,7 +82,123 @@ CONFIG_PARAMS: Dict[str, Union[str, int]] = {
     'c_replace_chars': [' ', '-'],
 }
 
-__CONFIG_MODULE = None
+
+class GenerationContext:
+    """
+        Context of a generation run: the arguments and parameters of the config, the config module
+        and the generated files. Every run has its own context, so several configs can be generated
+        in the same process, also in parallel threads. The context of the running generation is
+        activated with activate_context() and taken by CONFIG_ARGS, CONFIG_PARAMS and the config tools.
+    """
+    def __init__(self, config_file='', program_dir='', output=None):
+        self.args = copy.deepcopy(DEFAULT_CONFIG_ARGS)
+        self.params = copy.deepcopy(DEFAULT_CONFIG_PARAMS)
+        self.args['config_file'] = config_file
+        self.args['program_dir'] = program_dir
+        self.config_module = None
+        # name of the codec variant, empty for the config itself
+        self.variant_name = ''
+
+        # status of the files generated by the run, path relative to the output directory
+        self.generated_files = {}
+        # content of the generated files by path relative to the output directory. If set, the files
+        # are kept in this mapping and not written to the output directory.
+        self.output = output
+
+    def get_config_module(self):
+        # the config module is loaded from its file and not imported, so every context has its own module
+        if self.config_module is None:
+            config_file = Path(self.args['program_dir'], self.args['config_file']).resolve()
+            spec = importlib.util.spec_from_file_location(config_file.stem, config_file)
+            self.config_module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self.config_module)
+
+        return self.config_module
+
+    def get_variant_fixed_values(self, overlay):
+        """
+            Returns the names of the values of the overlay which a codec variant can't change.
+        """
+        return [name for name in overlay.keys()
+                if name in VARIANT_FIXED_VALUES or name.endswith(VARIANT_FIXED_SCHEMA_VALUES)]
+
+    def create_variant(self, overlay):
+        """
+            Returns the context of a codec variant. Its config module is a copy of the config module
+            with the values of the overlay, and it has its own output directory. The name of the variant
+            is the name of its output directory, if the overlay has no name.
+        """
+        config_module = self.get_config_module()
+
+        variant = GenerationContext(output={} if self.output is not None else None)
+        variant.args.update(self.args)
+        variant.args['output_dir'] = Path(self.args['program_dir'], overlay['output_dir']).resolve()
+        variant.variant_name = overlay.get('name', variant.args['output_dir'].name)
+
+        # the values are copied, as the generation changes some of them, e.g. the includes of c_files_to_generate
+        variant.config_module = types.ModuleType(config_module.__name__)
+        for name, value in vars(config_module).items():
+            if not name.startswith('__') and not isinstance(value, types.ModuleType):
+                setattr(variant.config_module, name, copy.deepcopy(value))
+        for name, value in overlay.items():
+            if name != 'name':
+                setattr(variant.config_module, name, copy.deepcopy(value))
+
+        with activate_context(variant):
+            process_config_parameters()
+
+        return variant
+
+
+class ContextConfig(MutableMapping):
+    """
+        Mapping of the arguments or parameters of the active generation context.
+    """
+    def __init__(self, name):
+        self.__name = name
+
+    def __values(self):
+        return getattr(get_context(), self.__name)
+
+    def __getitem__(self, key):
+        return self.__values()[key]
+
+    def __setitem__(self, key, value):
+        self.__values()[key] = value
+
+    def __delitem__(self, key):
+        del self.__values()[key]
+
+    def __iter__(self):
+        return iter(self.__values())
+
+    def __len__(self):
+        return len(self.__values())
+
+    def __repr__(self):
+        return repr(self.__values())
+
+
+# the context of the generation which is running, per thread. Without an activated context, the default
+# context is used, e.g. by the worker processes of the parallel generation.
+__DEFAULT_CONTEXT = GenerationContext()
+__ACTIVE_CONTEXT = contextvars.ContextVar('generation_context', default=__DEFAULT_CONTEXT)
+
+CONFIG_ARGS = ContextConfig('args')
+CONFIG_PARAMS = ContextConfig('params')
+
+
+def get_context() -> GenerationContext:
+    return __ACTIVE_CONTEXT.get()
+
+
+@contextlib.contextmanager
+def activate_context(context: GenerationContext):
+    token = __ACTIVE_CONTEXT.set(context)
+    try:
+        yield context
+    finally:
+        __ACTIVE_CONTEXT.reset(token)
 
 
 def check_config_file():
@@ -67,15 +215,21 @@ def set_config_arg_from_config_file(arg_name: str, config_dir: str):
 
 
 def get_config_module():
-    global __CONFIG_MODULE
+    return get_context().get_config_module()
 
-    if __CONFIG_MODULE is None:
-        config_module_name = Path(CONFIG_ARGS['config_file']).name
-        if config_module_name.endswith('.py'):
-            config_module_name = config_module_name[:-3]
-        __CONFIG_MODULE = importlib.import_module(config_module_name)
 
-    return __CONFIG_MODULE
+def init_config_args():
+    """
+        Sets the directories of the config file and its parameters in the active context.
+    """
+    config_module = get_config_module()
+    set_config_arg_from_config_file('template_dir', config_module.template_dir)
+    set_config_arg_from_config_file('output_dir', config_module.output_dir)
+    set_config_arg_from_config_file('schema_base_dir', config_module.schema_base_dir)
+    set_config_arg_from_config_file('log_dir', config_module.log_dir)
+    if getattr(config_module, 'cache_dir', ''):
+        set_config_arg_from_config_file('cache_dir', config_module.cache_dir)
+    process_config_parameters()
 
 
 def get_fragment_parameter_for_schema(schema_prefix):
@@ -89,6 +243,58 @@ def get_fragment_parameter_for_schema(schema_prefix):
     return fragments
 
 
+def get_messages_parameter_for_schema(schema_prefix):
+    """
+        Returns the message subset of the schema as dict of message name and coder direction.
+        A list of message names selects the messages for decoding and encoding.
+    """
+    messages = {}
+
+    config_module = get_config_module()
+    parameter = schema_prefix + 'messages'
+    if hasattr(config_module, parameter):
+        selection = getattr(config_module, parameter)
+        if isinstance(selection, dict):
+            messages = dict(selection)
+        else:
+            messages = {name: 'both' for name in selection}
+
+    return messages
+
+
+def get_max_lengths_parameter_for_schema(schema_prefix):
+    max_lengths = {}
+
+    config_module = get_config_module()
+    parameter = schema_prefix + 'max_lengths'
+    if hasattr(config_module, parameter):
+        max_lengths = getattr(config_module, parameter)
+
+    return max_lengths
+
+
+def get_grammar_tables_parameter_for_schema(schema_prefix):
+    grammar_tables = 0
+
+    config_module = get_config_module()
+    parameter = schema_prefix + 'grammar_tables'
+    if hasattr(config_module, parameter):
+        grammar_tables = getattr(config_module, parameter)
+
+    return grammar_tables
+
+
+def is_grammar_tables_enabled():
+    """
+        Returns True if at least one schema of the config uses grammar tables.
+    """
+    for params in get_config_module().c_files_to_generate.values():
+        if 'schema' in params and get_grammar_tables_parameter_for_schema(params['prefix']) == 1:
+            return True
+
+    return False
+
+
 def check_config_parameters():
     result = True
 
@@ -113,6 +319,24 @@ def process_config_parameters():
     if hasattr(config_module, 'add_debug_code'):
         CONFIG_PARAMS['add_debug_code'] = config_module.add_debug_code
 
+    ''' output definitions '''
+    # incremental_output
+    if hasattr(config_module, 'incremental_output'):
+        CONFIG_PARAMS['incremental_output'] = config_module.incremental_output
+
+    ''' bitstream definitions '''
+    # bitstream_word_access
+    if hasattr(config_module, 'bitstream_word_access'):
+        CONFIG_PARAMS['bitstream_word_access'] = config_module.bitstream_word_access
+
+    ''' state machine definitions '''
+    # fuse_grammar_chains
+    if hasattr(config_module, 'fuse_grammar_chains'):
+        CONFIG_PARAMS['fuse_grammar_chains'] = config_module.fuse_grammar_chains
+    # merge_event_codes
+    if hasattr(config_module, 'merge_event_codes'):
+        CONFIG_PARAMS['merge_event_codes'] = config_module.merge_event_codes
+
     ''' analysis tree definitions '''
     # generate_analysis_tree
     if hasattr(config_module, 'generate_analysis_tree'):
@@ -140,6 +364,17 @@ def process_config_parameters():
     if hasattr(config_module, 'byte_define_addendum'):
         CONFIG_PARAMS['byte_define_addendum'] = config_module.byte_define_addendum
 
+    ''' field length definitions '''
+    # string_max_length
+    if hasattr(config_module, 'string_max_length'):
+        CONFIG_PARAMS['string_max_length'] = config_module.string_max_length
+    # byte_array_max_length
+    if hasattr(config_module, 'byte_array_max_length'):
+        CONFIG_PARAMS['byte_array_max_length'] = config_module.byte_array_max_length
+    # max_length_clamp
+    if hasattr(config_module, 'max_length_clamp'):
+        CONFIG_PARAMS['max_length_clamp'] = config_module.max_length_clamp
+
     ''' name prefix definitions '''
     # init_function_prefix
     if hasattr(config_module, 'init_function_prefix'):
@@ -4,28 +4,86 @@
 
 """ Generator tools for the Exi Codegenerator """
 import os
+import time
 from pathlib import Path
+from jinja2 import FileSystemBytecodeCache, Template
 from xmlschema.extras.codegen import Environment, FileSystemLoader
 from cbexigen import tools
 from cbexigen.tools_config import CONFIG_ARGS
+from cbexigen.tools_profile import profile_enabled, profile_add_template
 from cbexigen.elementData import Particle, ElementData
 
 
 ''' common generator tools '''
 
 
-__GENERATOR = None
+class ProfiledTemplate(Template):
+    """
+        Template which adds the time of every render call to the profile of the templates.
+    """
+    def render(self, *args, **kwargs):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            profile_add_template(self.name, time.perf_counter() - wall_start, time.process_time() - cpu_start)
 
 
-def get_generator():
-    global __GENERATOR
+# the environments of the code templates by template directory, cache directory and profiling.
+# The environments are shared by the generation contexts with the same directories.
+__GENERATORS = {}
+__TEMPLATE_SUBDIRS = ['', 'decoder', 'encoder']
 
-    if __GENERATOR is None:
-        template_subdirs = ['', 'decoder', 'encoder']
-        template_dirs = [Path(os.path.join(CONFIG_ARGS['template_dir'], subdir)) for subdir in template_subdirs]
-        __GENERATOR = Environment(loader=FileSystemLoader(template_dirs))
 
-    return __GENERATOR
+def get_generator():
+    key = (str(CONFIG_ARGS['template_dir']), str(CONFIG_ARGS['cache_dir']), profile_enabled())
+
+    if key not in __GENERATORS:
+        template_dirs = [Path(os.path.join(CONFIG_ARGS['template_dir'], subdir)) for subdir in __TEMPLATE_SUBDIRS]
+
+        # the compiled templates are stored in the cache directory and only compiled again if they changed
+        bytecode_cache = None
+        if CONFIG_ARGS['cache_dir'] != '':
+            bytecode_dir = Path(CONFIG_ARGS['cache_dir'], 'templates')
+            bytecode_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+
+        # the templates don't change while generating, so a loaded template is taken from the
+        # environment cache without checking its file again
+        generator = Environment(loader=FileSystemLoader(template_dirs), bytecode_cache=bytecode_cache,
+                                auto_reload=False, cache_size=-1)
+        if profile_enabled():
+            generator.template_class = ProfiledTemplate
+        __GENERATORS[key] = generator
+
+    return __GENERATORS[key]
+
+
+def reload_templates():
+    """
+        Removes the loaded templates from the environments, so changed templates are loaded again.
+        The bytecode cache compiles a template again if its file changed.
+    """
+    for generator in __GENERATORS.values():
+        generator.cache.clear()
+
+
+def precompile_templates():
+    """
+        Compiles all templates into the bytecode cache and returns the number of compiled templates.
+    """
+    generator = get_generator()
+    names = set()
+    for name in generator.list_templates(extensions=['jinja']):
+        # the templates of the subdirectories are loaded by their name, like the generator does
+        subdir, _, filename = name.rpartition('/')
+        names.add(filename if subdir in __TEMPLATE_SUBDIRS else name)
+
+    for name in sorted(names):
+        generator.get_template(name)
+
+    return len(names)
 
 
 def get_includes_content(config_dict):
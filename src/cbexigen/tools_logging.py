@@ -3,7 +3,11 @@
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 
 """ Logging tools for the Exi Codegenerator """
+import atexit
+import io
 import logging
+import logging.handlers
+import queue
 from pathlib import Path
 from cbexigen.elementData import Particle, ElementData
 from cbexigen.tools_config import CONFIG_ARGS
@@ -11,8 +15,72 @@ from cbexigen.tools_config import CONFIG_ARGS
 
 ''' Log tools '''
 
+# verbosity of the console output and the log
+# quiet: no console output, the log has the messages of the generator but no trace of the analysis
+VERBOSITY_QUIET = 0
+# normal: the messages of the generator are written to the console and the log
+VERBOSITY_NORMAL = 1
+# trace: additionally the tree of the analyzed schema elements and the analyzer data
+VERBOSITY_TRACE = 2
+
+
+class LogFileRouter(logging.Handler):
+    """
+        Writes the records of the log queue to the log files, in the background thread of the queue listener.
+        A record is written to the file of its logger and, like a propagated record, to the log file.
+    """
+    def __init__(self):
+        super().__init__()
+        self.file_handlers = {}
+
+    def emit(self, record):
+        # the files are opened and closed in the order of the records, so the records of a previous
+        # run are not written to the new file and the close of a previous run does not close it
+        if getattr(record, 'log_open', None) is not None:
+            self.file_handlers[record.name] = record.log_open
+            return
+
+        if getattr(record, 'log_close', None) is not None:
+            if self.file_handlers.get(record.name, None) is record.log_close:
+                del self.file_handlers[record.name]
+            record.log_close.close()
+            return
+
+        handler = self.file_handlers.get(record.name, None)
+
+        # already formatted text of the log of a worker process
+        if getattr(record, 'log_text', None) is not None:
+            if handler is not None:
+                handler.stream.write(record.log_text)
+                handler.flush()
+            return
+
+        if handler is not None and record.name != 'root':
+            handler.handle(record)
+
+        handler = self.file_handlers.get('root', None)
+        if handler is not None:
+            handler.handle(record)
+
+    def close(self):
+        for handler in self.file_handlers.values():
+            handler.close()
+        self.file_handlers.clear()
+        super().close()
+
+
+__LOG_ROUTER = None
+__LOG_QUEUE = None
+__LOG_LISTENER = None
+# the open file handlers of the loggers by logger name
+__LOG_FILES = {}
+
 
 def log_init_logger(logger_name, filename, level=logging.INFO, mode='w'):
+    # without log directory, e.g. for a generation in memory, the logger has no file
+    if CONFIG_ARGS['log_dir'] == '':
+        return
+
     logfile = Path(CONFIG_ARGS['log_dir'], filename).resolve()
     file_hd = logging.FileHandler(logfile, mode)
 
@@ -21,7 +89,12 @@ def log_init_logger(logger_name, filename, level=logging.INFO, mode='w'):
 
     log = logging.getLogger(logger_name)
     log.setLevel(level)
-    log.addHandler(file_hd)
+    __LOG_FILES[logger_name] = file_hd
+    if __LOG_LISTENER is not None:
+        # the records get to the log queue by the root logger
+        __LOG_QUEUE.put(logging.makeLogRecord({'name': logger_name, 'log_open': file_hd}))
+    else:
+        log.addHandler(file_hd)
 
 
 def log_write_logger(logger_name, message):
@@ -29,28 +102,118 @@ def log_write_logger(logger_name, message):
 
 
 def log_deinit_logger(logger_name):
-    log = logging.Logger.manager.loggerDict.get(logger_name)
-    if log is not None:
-        hnd = log.handlers[0]
-        if hnd:
-            hnd.close()
+    """
+        Closes the file of the logger, the next log_init_logger() writes the file again.
+    """
+    file_hd = __LOG_FILES.pop(logger_name, None)
+    if file_hd is None:
+        return
 
+    if __LOG_LISTENER is not None:
+        # the file is closed after the records before are written
+        __LOG_QUEUE.put(logging.makeLogRecord({'name': logger_name, 'log_close': file_hd}))
+        return
+
+    logging.getLogger(logger_name).removeHandler(file_hd)
+    file_hd.close()
 
-def log_exists_logger(logger_name):
-    log = logging.Logger.manager.loggerDict.get(logger_name)
 
-    return log is not None
+def log_exists_logger(logger_name):
+    return logger_name in __LOG_FILES
 
 
 def log_init(file_name):
+    """
+        Initializes the log and the error log. The records are put into a queue and written to the
+        log files by a background thread, so the generator does not wait for the file output.
+    """
+    global __LOG_ROUTER, __LOG_QUEUE, __LOG_LISTENER
+
     logfile = Path(CONFIG_ARGS['log_dir'], file_name).resolve()
-    logging.basicConfig(filename=logfile, filemode="w", level=logging.INFO)
+    file_hd = logging.FileHandler(logfile, 'w')
+    file_hd.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+    __LOG_ROUTER = LogFileRouter()
+    __LOG_ROUTER.file_handlers['root'] = file_hd
+    __LOG_QUEUE = queue.SimpleQueue()
+    __LOG_LISTENER = logging.handlers.QueueListener(__LOG_QUEUE, __LOG_ROUTER)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(__LOG_QUEUE))
+
+    __LOG_LISTENER.start()
+    atexit.register(log_close)
 
     log_init_logger('error', 'error_log.txt', logging.ERROR)
 
 
+def log_close():
+    """
+        Writes the records which are still in the log queue and closes the log files.
+    """
+    global __LOG_LISTENER
+
+    if __LOG_LISTENER is not None:
+        __LOG_LISTENER.stop()
+        __LOG_LISTENER = None
+        __LOG_ROUTER.close()
+        __LOG_FILES.clear()
+
+
+def log_init_buffered():
+    """
+        Initializes the logging of a worker process of the parallel generation. The log and the error log
+        are kept in memory and written to the log files by the main process with log_write_buffered.
+    """
+    global __LOG_LISTENER
+
+    # the log queue of the main process is not used, the loggers of the coders write their files directly
+    __LOG_LISTENER = None
+    __LOG_FILES.clear()
+    buffers = io.StringIO(), io.StringIO()
+
+    for logger, buffer, level in [(logging.getLogger(), buffers[0], logging.INFO),
+                                  (logging.getLogger('error'), buffers[1], logging.ERROR)]:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+        handler = logging.StreamHandler(buffer)
+        if logger.name == 'error':
+            handler.setFormatter(logging.Formatter('%(levelname)s:%(name)s:  %(message)s'))
+        else:
+            handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        logger.addHandler(handler)
+        logger.setLevel(level)
+
+    return buffers
+
+
+def log_write_buffered(log_text, error_text):
+    # without log directory, e.g. for a generation in memory, the logs of the workers are not written
+    if CONFIG_ARGS['log_dir'] == '':
+        return
+
+    if __LOG_LISTENER is not None:
+        for logger_name, text in [('root', log_text), ('error', error_text)]:
+            __LOG_QUEUE.put(logging.makeLogRecord({'name': logger_name, 'log_text': text}))
+        return
+
+    for logger, text in [(logging.getLogger(), log_text), (logging.getLogger('error'), error_text)]:
+        for handler in logger.handlers:
+            if isinstance(handler, logging.StreamHandler):
+                handler.acquire()
+                try:
+                    handler.stream.write(text)
+                    handler.flush()
+                finally:
+                    handler.release()
+
+
 def log_write(message):
-    logging.info(message)
+    # not logging.info(), which would configure the logging of an application generating in memory
+    logging.getLogger().info(message)
 
 
 def log_write_error(message):
@@ -64,13 +227,13 @@ def log_write_dict(name, elem_dict):
     for elem, value in sorted(elem_dict.items()):
         message += indent + elem + ": " + str(value) + "\n"
 
-    logging.info(message)
+    logging.getLogger().info(message)
 
 
 def log_write_element_pos_data(element: ElementData):
     message = "   name / type short:   " + element.name_short + " / " + element.type_short + \
               " (" + str(element.level) + ", " + str(element.count) + ")"
-    logging.info(message)
+    logging.getLogger().info(message)
 
 
 def log_write_particle(particle: Particle):
@@ -96,7 +259,7 @@ def log_write_particle(particle: Particle):
     message += indent + "complex:\t\t\t" + str(particle.is_complex) + "\n"
     message += indent + "substitute:\t\t\t" + str(particle.is_substitute)
 
-    logging.info(message)
+    logging.getLogger().info(message)
 
 
 def log_write_element(element: ElementData):
@@ -132,7 +295,7 @@ def log_write_element(element: ElementData):
     message += indent + "final:\t\t\t\t" + str(element.final) + "\n"
     message += indent + "abstract:\t\t\t" + str(element.abstract)
 
-    logging.info(message)
+    logging.getLogger().info(message)
 
     # list of particles
     for particle in element.particles:
@@ -142,8 +305,22 @@ def log_write_element(element: ElementData):
 
 
 def msg_write(message, blank_line_before=False):
-    print(message)
+    if CONFIG_ARGS['verbosity'] >= VERBOSITY_NORMAL:
+        print(message)
 
     if blank_line_before:
         log_write('')
     log_write(message)
+
+
+def msg_trace_enabled():
+    return CONFIG_ARGS['verbosity'] >= VERBOSITY_TRACE
+
+
+def msg_trace(message, *args):
+    """
+        Writes a message of the trace of the analysis to the console and the log.
+        The message is formatted with the args only if the trace is enabled.
+    """
+    if CONFIG_ARGS['verbosity'] >= VERBOSITY_TRACE:
+        msg_write(message % args if args else message)
@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2022 - 2023 chargebyte GmbH
+# Copyright (c) 2022 - 2023 Contributors to EVerest
+
+""" Profiling tools for the Exi Codegenerator """
+import contextlib
+import functools
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+from cbexigen.tools_config import CONFIG_ARGS
+
+PROFILE_FILE_NAME = 'profile.json'
+CPROFILE_FILE_NAME = 'profile.prof'
+
+# the phases in the order they were started, and the totals of the rendered templates by template name
+PROFILE_PHASES = []
+PROFILE_TEMPLATES = {}
+
+# the phases which are running, the innermost phase is the last one
+__RUNNING_PHASES = []
+
+
+def profile_enabled():
+    return CONFIG_ARGS['profile'] == 1
+
+
+def profile_start():
+    """
+        Starts the tracing of the memory allocations, the peak memory of every phase is taken from it.
+    """
+    PROFILE_PHASES.clear()
+    PROFILE_TEMPLATES.clear()
+    __RUNNING_PHASES.clear()
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextlib.contextmanager
+def profile_phase(phase, name=''):
+    """
+        Records the wall time, the cpu time and the peak memory of the phase, if profiling is enabled.
+        The name is the item the phase works on, e.g. the schema, the type or the output file.
+        Phases can be nested, the peak memory of a phase includes the peak memory of its inner phases.
+    """
+    if not profile_enabled():
+        yield
+        return
+
+    # the peak of the outer phase up to now is kept, so the peak can be reset for the inner phase
+    if len(__RUNNING_PHASES) > 0:
+        outer = __RUNNING_PHASES[-1]
+        outer['peak_memory'] = max(outer['peak_memory'], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+
+    record = {
+        'phase': phase,
+        'name': name,
+        'depth': len(__RUNNING_PHASES),
+        'wall_time': 0.0,
+        'cpu_time': 0.0,
+        'peak_memory': 0,
+    }
+    PROFILE_PHASES.append(record)
+    __RUNNING_PHASES.append(record)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        record['wall_time'] = time.perf_counter() - wall_start
+        record['cpu_time'] = time.process_time() - cpu_start
+        record['peak_memory'] = max(record['peak_memory'], tracemalloc.get_traced_memory()[1])
+        __RUNNING_PHASES.pop()
+
+        if len(__RUNNING_PHASES) > 0:
+            outer = __RUNNING_PHASES[-1]
+            outer['peak_memory'] = max(outer['peak_memory'], record['peak_memory'])
+
+
+def profiled(phase):
+    """
+        Decorator which records every call of the function as phase, with the function name as name.
+    """
+    def decorator(func):
+        name = func.__name__.lstrip('_')
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profile_enabled():
+                return func(*args, **kwargs)
+
+            with profile_phase(phase, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profile_add_template(template_name, wall_time, cpu_time):
+    """
+        Adds a render call of the template to the totals of the template. The templates are rendered
+        too often to record every call as phase.
+    """
+    total = PROFILE_TEMPLATES.setdefault(template_name, {'calls': 0, 'wall_time': 0.0, 'cpu_time': 0.0})
+    total['calls'] += 1
+    total['wall_time'] += wall_time
+    total['cpu_time'] += cpu_time
+
+
+def profile_get_data():
+    return list(PROFILE_PHASES), dict(PROFILE_TEMPLATES)
+
+
+def profile_add_data(phases, templates):
+    """
+        Adds the profile data of a worker process of the parallel generation.
+        The peak memory of a phase of the worker is the peak memory of the worker process.
+    """
+    # the phases of the worker are inner phases of the running phase of the main process,
+    # so the peak memory of the running phase includes their peak memory
+    for record in phases:
+        record['depth'] += len(__RUNNING_PHASES)
+        if len(__RUNNING_PHASES) > 0:
+            outer = __RUNNING_PHASES[-1]
+            outer['peak_memory'] = max(outer['peak_memory'], record['peak_memory'])
+    PROFILE_PHASES.extend(phases)
+    for template_name, total in templates.items():
+        current = PROFILE_TEMPLATES.setdefault(template_name, {'calls': 0, 'wall_time': 0.0, 'cpu_time': 0.0})
+        for key in current.keys():
+            current[key] += total[key]
+
+
+def write_profile_report():
+    """
+        Writes the recorded phases and the totals of the rendered templates to the log directory.
+    """
+    templates = {}
+    for template_name in sorted(PROFILE_TEMPLATES.keys(), key=lambda item: -PROFILE_TEMPLATES[item]['wall_time']):
+        templates[template_name] = PROFILE_TEMPLATES[template_name]
+
+    report = {
+        'config_file': str(CONFIG_ARGS['config_file']),
+        'jobs': CONFIG_ARGS['jobs'],
+        'phases': PROFILE_PHASES,
+        'templates': templates,
+    }
+
+    with open(Path(CONFIG_ARGS['log_dir'], PROFILE_FILE_NAME), 'w') as fp:
+        json.dump(report, fp, indent=2)
+        fp.write('\n')
@@ -0,0 +1,39 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2022 - 2023 chargebyte GmbH
+# Copyright (c) 2022 - 2023 Contributors to EVerest
+
+""" Schema tools for the Exi Codegenerator """
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+
+XSD_IMPORT = '{http://www.w3.org/2001/XMLSchema}import'
+XSD_REFERENCES = [XSD_IMPORT, '{http://www.w3.org/2001/XMLSchema}include',
+                  '{http://www.w3.org/2001/XMLSchema}redefine', '{http://www.w3.org/2001/XMLSchema}override']
+
+
+def get_schema_files(schema_file: Path):
+    """
+        Returns the schema file and all local files imported, included, redefined or overridden by it.
+        A missing or invalid file is returned as well, so a change of it is noticed.
+    """
+    files = set()
+    pending = [schema_file.resolve()]
+    while len(pending) > 0:
+        file = pending.pop()
+        if file in files:
+            continue
+        files.add(file)
+
+        try:
+            root = ElementTree.parse(file).getroot()
+        except (OSError, ElementTree.ParseError):
+            continue
+
+        for tag in XSD_REFERENCES:
+            for item in root.iter(tag):
+                location = item.get('schemaLocation')
+                if location is not None and '://' not in location:
+                    pending.append(Path(file.parent, location).resolve())
+
+    return files
+
@@ -0,0 +1,55 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2022 - 2023 chargebyte GmbH
+# Copyright (c) 2022 - 2023 Contributors to EVerest
+
+""" Watch tools for the Exi Codegenerator """
+import time
+from pathlib import Path
+
+# the seconds between two checks of the watched files
+WATCH_INTERVAL = 0.5
+
+
+def get_file_states(paths):
+    """
+        Returns the modification time and the size of the watched files by file.
+        A directory is watched with all files below it, a missing path has no files.
+    """
+    states = {}
+    for path in paths:
+        path = Path(path)
+        files = path.rglob('*') if path.is_dir() else [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            if file.is_file():
+                states[file.resolve()] = (stat.st_mtime_ns, stat.st_size)
+
+    return states
+
+
+def wait_for_changes(paths, states, interval=WATCH_INTERVAL):
+    """
+        Waits until one of the watched files is changed, added or removed.
+        The files are checked again until they did not change for one interval, so an editor or a
+        version control system writing several files leads to one change only.
+        Returns the new states of the files and the changed files.
+    """
+    while True:
+        time.sleep(interval)
+        new_states = get_file_states(paths)
+        if new_states != states:
+            break
+
+    while True:
+        time.sleep(interval)
+        stable_states = get_file_states(paths)
+        if stable_states == new_states:
+            break
+        new_states = stable_states
+
+    changed = {file for file in states.keys() | new_states.keys() if states.get(file) != new_states.get(file)}
+
+    return new_states, changed
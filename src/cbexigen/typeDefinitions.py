@@ -2,30 +2,163 @@
 # Copyright (c) 2022 - 2023 chargebyte GmbH
 # Copyright (c) 2022 - 2023 Contributors to EVerest
 
-from dataclasses import dataclass
+import heapq
+from dataclasses import dataclass, field
 from typing import Dict
 
+from cbexigen.elementData import Particle
+from cbexigen.tools_logging import log_write_error
+
+# directions of the message subset, 'both' selects a message for all of them
+CODER_DIRECTIONS = ('decode', 'encode')
+
 
 @dataclass
 class AnalyzerData:
-    schema_identifier = ''
-    root_elements = []
-    generate_elements = []
-    generate_elements_types = {}
-
-    known_elements = {}
-    known_particles = {}
-    known_enums = {}
-    known_prototypes = {}
-    known_fragments = {}
-
-    max_occurs_changed = {}
-    namespace_elements = {}
-    schema_builtin_types = {}
-
-    add_debug_code_enabled = 0
-    debug_code_current_message_id = 1
-    debug_code_messages = {}
+    # every instance has its own containers, so several generations can run in the same process
+    schema_identifier: str = ''
+    root_elements: list = field(default_factory=list)
+    generate_elements: list = field(default_factory=list)
+    generate_elements_types: dict = field(default_factory=dict)
+
+    known_elements: dict = field(default_factory=dict)
+    known_particles: dict = field(default_factory=dict)
+    known_enums: dict = field(default_factory=dict)
+    known_prototypes: dict = field(default_factory=dict)
+    known_fragments: dict = field(default_factory=dict)
+
+    max_occurs_changed: dict = field(default_factory=dict)
+    namespace_elements: dict = field(default_factory=dict)
+    schema_builtin_types: dict = field(default_factory=dict)
+
+    # message subset from the config, and per coder direction ('decode', 'encode')
+    # the names of the messages and the type names of the elements which are not generated
+    selected_messages: dict = field(default_factory=dict)
+    pruned_messages: dict = field(default_factory=dict)
+    pruned_elements: dict = field(default_factory=dict)
+
+    # values of the schema which are needed for generating the datatypes, so the datatypes
+    # can be generated without the schema: the enumerations of the types and the global element names
+    schema_enumerations: dict = field(default_factory=dict)
+    schema_element_names: list = field(default_factory=list)
+
+    # types used by the complex particles of every type, as list of particle name and type name
+    type_dependencies: dict = field(default_factory=dict)
+
+    # grammars of the types, computed by the first coder and rendered by the decoder and the encoder,
+    # per order of the generated type names as list of the grammars and the log lines of every type
+    element_grammars: dict = field(default_factory=dict)
+
+    add_debug_code_enabled: int = 0
+    debug_code_current_message_id: int = 1
+    debug_code_messages: dict = field(default_factory=dict)
+
+    def freeze(self):
+        """
+            Freezes the elements and particles after the analysis, the code generation only reads them.
+        """
+        for element in self.root_elements + self.generate_elements:
+            element.freeze()
+        for particle in self.known_particles.values():
+            particle.freeze()
+        for items in self.namespace_elements.values():
+            for item in items:
+                if isinstance(item, Particle):
+                    item.freeze()
+
+    def is_message_pruned(self, name, direction='') -> bool:
+        # without direction, the message is pruned if it is generated for neither decoding nor encoding
+        if direction:
+            return name in self.pruned_messages.get(direction, ())
+
+        return all(name in self.pruned_messages.get(item, ()) for item in CODER_DIRECTIONS)
+
+    def is_particle_pruned(self, element, particle, direction='') -> bool:
+        # the particles of namespace elements are messages
+        return element.is_in_namespace_elements and self.is_message_pruned(particle.name, direction)
+
+    def is_element_pruned(self, typename, direction='') -> bool:
+        if direction:
+            return typename in self.pruned_elements.get(direction, ())
+
+        return all(typename in self.pruned_elements.get(item, ()) for item in CODER_DIRECTIONS)
+
+    def __get_missing_dependencies(self, element, generated, direction):
+        missing = []
+        for name, typename in self.type_dependencies.get(element.typename, ()):
+            # the particles of namespace elements are messages
+            if element.is_in_namespace_elements and self.is_message_pruned(name, direction):
+                continue
+            if typename not in generated and typename not in missing:
+                missing.append(typename)
+
+        return missing
+
+    def get_generate_order(self, elements, generated, module, direction=''):
+        """
+            Returns the elements in the order of generation, every element after the types it uses.
+            Of all elements which can be generated next, the first one of the list is taken, so the
+            order of the list is kept as far as possible. The types in generated are already generated.
+            The elements which cannot be generated because of a cyclic dependency or an unknown type
+            are reported and left out.
+        """
+        done = set(generated)
+        waiting = {}
+        missing_count = []
+        ready = []
+        for index, element in enumerate(elements):
+            missing = self.__get_missing_dependencies(element, done, direction)
+            missing_count.append(len(missing))
+            for typename in missing:
+                waiting.setdefault(typename, []).append(index)
+            if len(missing) == 0:
+                heapq.heappush(ready, index)
+
+        result = []
+        while len(ready) > 0:
+            element = elements[heapq.heappop(ready)]
+            result.append(element)
+            if element.typename in done:
+                continue
+
+            done.add(element.typename)
+            for index in waiting.pop(element.typename, ()):
+                missing_count[index] -= 1
+                if missing_count[index] == 0:
+                    heapq.heappush(ready, index)
+
+        if len(result) < len(elements):
+            generated_ids = set(id(item) for item in result)
+            self.__log_unresolved_dependencies([item for item in elements if id(item) not in generated_ids],
+                                               done, module, direction)
+
+        return result
+
+    def __log_unresolved_dependencies(self, elements, generated, module, direction):
+        known = set(element.typename for element in elements)
+        missing = {element.typename: self.__get_missing_dependencies(element, generated, direction)
+                   for element in elements}
+
+        for element in elements:
+            unknown = [typename for typename in missing[element.typename] if typename not in known]
+            if len(unknown) > 0:
+                log_write_error(f'Module {module}: {element.typename} is not generated, '
+                                f'unknown type(s) {", ".join(unknown)}')
+                continue
+
+            # follow the first missing type until a type repeats or a type is missing for another reason
+            path = [element.typename]
+            typename = missing[element.typename][0]
+            while typename not in path and typename in missing:
+                path.append(typename)
+                typename = missing[typename][0] if len(missing[typename]) > 0 else ''
+            if typename in path:
+                path.append(typename)
+                log_write_error(f'Module {module}: {element.typename} is not generated, '
+                                f'cyclic dependency {" -> ".join(path)}')
+            else:
+                log_write_error(f'Module {module}: {element.typename} is not generated, '
+                                f'it depends on the types {" -> ".join(path[1:])} which are not generated')
 
 
 @dataclass
@@ -15,11 +15,43 @@ schema_base_dir = 'input/schemas'
 log_dir = 'output/log'
 log_file_name = 'logfile.txt'
 
+# cache of the analyzer data, the analysis of a schema is only done again if one of its
+# schema files, the config parameters of the analysis or the generator itself changed.
+# remove or comment out to always analyze the schemas
+cache_dir = 'output/cache'
+
+# output files of the generator
+# 1: a file is only written if its content changed, so the unchanged files keep their time stamp
+#    and are not built again
+# 0: every file is written (previous implementation)
+# the status of every file in the last run is listed in manifest.txt of the log directory
+incremental_output = 1
+
 # add debug code while generating code
 # this will add calls to status_callback if set at init of exi_bitstream_t
 # and create separate code for the debugging functions
 add_debug_code = 0
 
+# bitstream access of the static exi_bitstream code
+# 1: bits are read and written up to 32 bits at a time using a 64-bit accumulator,
+#    with one bounds check per call
+# 0: bits are read and written one at a time (previous implementation)
+bitstream_word_access = 1
+
+# state machine of the generated coder functions
+# 1: grammars with a single START event are coded one after another in the case of
+#    the first grammar (straight-line code), the switch is only used at branch points
+# 0: every grammar is a separate case of the switch (previous implementation)
+fuse_grammar_chains = 1
+
+# event codes of the generated coder functions
+# 1: the characters event of a simple type is written and read together with the event code
+#    of the element, if the grammar has a single event, the decoder compares both as one value
+#    Only the characters event is merged, the END element events and the event codes of
+#    consecutive grammars are written and read separately.
+# 0: every event code is written and read separately (previous implementation)
+merge_event_codes = 1
+
 # generate analysis tree while generating code
 # this will generate an analysis tree file starting from the root element
 # for the 15118-20 every message has its separate tree file
@@ -35,6 +67,23 @@ array_define_addendum = '_ARRAY_SIZE'
 char_define_addendum = '_CHARACTER_SIZE'
 byte_define_addendum = '_BYTES_SIZE'
 
+# field length definitions
+# the characters and bytes arrays are sized with the maxLength facet of the schema,
+# without facet with these global lengths (EXI_STRING_MAX_LEN, EXI_BYTE_ARRAY_MAX_LEN)
+string_max_length = 64
+byte_array_max_length = 350
+# upper limit for the length of all characters and bytes arrays, 0 = no limit
+max_length_clamp = 0
+# lengths of single fields, these override the facet of the schema but cannot exceed it
+# the name of this parameter must consist of the schema prefix (chosen below)
+# plus "max_lengths", the key is the element name for characters and the type name for bytes.
+# Fields sharing the same define are sized with the largest of their lengths.
+# The memory saved per message is written to the logfile.
+# iso2_max_lengths = {
+#     'EVSEID': 37,
+#     'certificateType': 800,
+# }
+
 # name prefix definitions
 init_function_prefix = 'init_'
 encode_function_prefix = 'encode_'
@@ -53,6 +102,8 @@ iso2_ambiguous_element_names = {
 apply_optimizations = 1
 # the name of this parameter must consist of the schema prefix (chosen below)
 # plus "array_optimizations"
+# A type name limits all arrays of this type, a path 'ParentType/ParticleName'
+# limits only the array of this particle and takes precedence over the type name.
 appHand_array_optimizations = {
     'AppProtocolType': 5
 }
@@ -63,19 +114,44 @@ iso2_array_optimizations = {
     'PMaxScheduleEntryType': 12,
     'SalesTariffEntryType': 12,
     'ParameterSetType': 5,
-    # this shall apply to array ListOfRootCertificateIDsType->RootCertificateID only
-    'X509IssuerSerialType': 5
+    'ListOfRootCertificateIDsType/RootCertificateID': 5
 }
 iso20_array_optimizations = {
     # FIXME
     # gdb's stack overflows on the original struct site - no other
     # reason to restrict this currently
-    'PriceRuleStackType': 64,
-    # Workaround for missing loop implementation of large arrays (https://github.com/EVerest/cbexigen/issues/28).
-    'ParameterSetType': 4,
-    'ParameterType': 8
+    'PriceRuleStackType': 64
 }
 
+# generate table driven de- and encoder
+# the name of this parameter must consist of the schema prefix (chosen below)
+# plus "grammar_tables"
+# 1: the grammars are stored as const tables and processed by the shared interpreter
+#    of exi_grammar_table.c, the generated code only contains the event content.
+#    This reduces the code size, but costs an indirect call for every event.
+#    The static files exi_grammar_table.h and .c are only generated if a schema uses grammar tables.
+# 0: every type gets its own grammar state machine (default)
+# iso20_grammar_tables = 1
+
+# generate only a subset of the messages
+# the name of this parameter must consist of the schema prefix (chosen below)
+# plus "messages"
+# The messages are the root elements or the elements of the message body, e.g.
+# the list of the substitution group BodyElement. Only the types reachable from
+# the selected messages (and the fragments below) are generated. Messages which
+# are not selected keep their event codes, so the EXI stream stays conformant,
+# the decoder returns EXI_ERROR__UNSUPPORTED_SUB_EVENT and the encoder has no
+# branch for them.
+# A list selects the messages for decoding and encoding, a dict selects every
+# message for 'decode', 'encode' or 'both'.
+# iso2_messages = {
+#     'SessionSetupReq': 'decode',
+#     'SessionSetupRes': 'encode',
+#     'CurrentDemandReq': 'decode',
+#     'CurrentDemandRes': 'encode',
+# }
+# appHand_messages = ['supportedAppProtocolReq', 'supportedAppProtocolRes']
+
 # if fragment de- and encoder should be generated, set this value to 1.
 # Currently only complex elements can be added to the fragment coders.
 # NOTE! There may be problems when comparing the signature of the eMAID.
@@ -121,6 +197,27 @@ iso20_dc_fragments = [
     'DC_ChargeParameterDiscoveryRes',
 ]
 
+# codec variants, generated in the same run from the same analysis of the schemas
+# Every variant overlays the values of this config with its own values and is generated
+# into its own output_dir, the name is used for the messages and the manifest.
+# A variant can change e.g. the array optimizations, the message subset, the field lengths,
+# the fragments and the debug code, but not the values which are used by the analysis of
+# the schema structure: c_files_to_generate, the directories of the schemas, the log and
+# the cache, generate_fragments, the analysis trees and the ambiguous element names.
+# codec_variants = [
+#     {
+#         'name': 'small',
+#         'output_dir': 'output/c_small',
+#         'iso2_array_optimizations': {'SAScheduleTupleType': 1},
+#         'iso2_messages': ['SessionSetupReq', 'SessionSetupRes'],
+#     },
+#     {
+#         'name': 'debug',
+#         'output_dir': 'output/c_debug',
+#         'add_debug_code': 1,
+#     },
+# ]
+
 # general C code style
 c_code_indent_chars = 4
 # these characters will be replaced by an underscore in generated code
@@ -235,6 +332,25 @@ c_files_to_generate = {
             'include_other': []
         }
     },
+    'exi_grammar_table': {
+        'prefix': '',
+        'type': 'static',
+        'folder': 'common',
+        'h': {
+            'template': 'static_code/exi_grammar_table.h.jinja',
+            'filename': 'exi_grammar_table.h',
+            'identifier': 'EXI_GRAMMAR_TABLE_H',
+            'include_std_lib': [],
+            'include_other': []
+        },
+        'c': {
+            'template': 'static_code/exi_grammar_table.c.jinja',
+            'filename': 'exi_grammar_table.c',
+            'identifier': 'EXI_GRAMMAR_TABLE_C',
+            'include_std_lib': [],
+            'include_other': []
+        }
+    },
     'exi_types_decoder': {
         'prefix': '',
         'type': 'static',
@@ -4,10 +4,13 @@
 
 import sys
 import argparse
+import cProfile
 from pathlib import Path
 
 import cbexigen.tools_config as conf
 from cbexigen.tools_logging import log_init
+from cbexigen.tools_generator import precompile_templates
+from cbexigen.tools_profile import profile_start, profile_phase, write_profile_report, CPROFILE_FILE_NAME
 from cbexigen import FileGenerator as Generator
 
 
@@ -21,21 +24,49 @@ def analyze_schema(argv):
                               the schema files, YOU accept the ISO Customer Licence Agreement \
                               (“Licence Agreement”), clauses 1. ISOs Copyright, \
                               7. Termination, 8. Limitations, and 9. Governing Law.")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of worker processes, the entries of c_files_to_generate are \
+                              grouped by schema and every group is generated in its own process")
+    parser.add_argument("--verbosity", type=int, choices=[0, 1, 2], default=2,
+                        help="0 = no console output, 1 = messages of the generator, \
+                              2 = additionally the trace of the schema analysis and the analyzer data")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Same as --verbosity 0, the schema analysis is not traced")
+    parser.add_argument("--profile", action="store_true",
+                        help="Writes the wall time, cpu time and peak memory of the phases of the generation \
+                              to profile.json in the log directory")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="Writes the cProfile statistics of the generation to profile.prof in the log \
+                              directory, without the worker processes of --jobs")
+    parser.add_argument("--precompile-templates", action="store_true",
+                        help="Compiles all code templates into the cache directory of the config and exits, \
+                              the following runs load the compiled templates from there")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keeps running after the generation and generates the files again on changes of the \
+                              config, the schemas and the templates, the schemas are generated serially")
     args = parser.parse_args(argv[1:])
     config = vars(args)
 
-    conf.CONFIG_ARGS['program_dir'] = Path(__file__).parent.resolve()
-    conf.CONFIG_ARGS['config_file'] = config['config_file']
+    context = conf.GenerationContext(config['config_file'], Path(__file__).parent.resolve())
+    context.args['jobs'] = max(1, config['jobs'])
+    context.args['verbosity'] = 0 if config['quiet'] else config['verbosity']
+    context.args['profile'] = 1 if config['profile'] else 0
+    if config['watch']:
+        # the analyzer data is kept in memory of the generator process, so there are no worker processes
+        context.args['jobs'] = 1
+        context.args['watch'] = 1
+
+    with conf.activate_context(context):
+        run_generator(context, args)
+
+
+def run_generator(context: conf.GenerationContext, args):
     if not conf.check_config_file():
         print('Config file does not exist.')
         exit(1)
 
-    config_module = conf.get_config_module()
-    conf.set_config_arg_from_config_file('template_dir', config_module.template_dir)
-    conf.set_config_arg_from_config_file('output_dir', config_module.output_dir)
-    conf.set_config_arg_from_config_file('schema_base_dir', config_module.schema_base_dir)
-    conf.set_config_arg_from_config_file('log_dir', config_module.log_dir)
-    conf.process_config_parameters()
+    config_module = context.get_config_module()
+    conf.init_config_args()
 
     if not conf.check_config_parameters():
         print('Error in config file.')
@@ -50,8 +81,35 @@ def analyze_schema(argv):
               7. Termination, 8. Limitations, and 9. Governing Law.')
         conf.download_schemas()
 
-    gen = Generator.FileGenerator()
-    gen.generate_files()
+    if args.precompile_templates:
+        if context.args['cache_dir'] == '':
+            print('Precompiling the templates needs a cache_dir in the config file.')
+            exit(2)
+        count = precompile_templates()
+        print(f'{count} templates compiled to {context.args["cache_dir"]}.')
+        return
+
+    if args.profile:
+        profile_start()
+
+    profiler = None
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    with profile_phase('generation', str(context.args['config_file'])):
+        gen = Generator.FileGenerator(context)
+        gen.generate_files()
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(Path(context.args['log_dir'], CPROFILE_FILE_NAME))
+
+    if args.profile:
+        write_profile_report()
+
+    if args.watch:
+        Generator.watch_files(context)
 
 
 if __name__ == '__main__':